@@ -1,31 +1,100 @@
+from __future__ import annotations
+
 from .config import Config
-from typing import List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Iterator
 from collections import defaultdict
-from dateutil import parser
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+import threading
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
-from tqdm import tqdm
+from datetime import date, datetime, timedelta, timezone
+
+from .pipeline import FetchTask, IngestPipeline
+from .budget import SpendLedger, log_event
+
+# resolved symbology windows are recorded in "time".time_range under this table
+SYMBOLOGY_TABLE = "symbology"
 
-from .dbnclient import DBNClient
-from .fredclient import FREDClient
-from .postgreclient import PostgreDBClient
+# pandas, Polars, the Databento and FRED SDKs and psycopg2 take most of a second to
+# import, so they are only loaded when a client or a conversion first needs them
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .dbnclient import DBNClient
+    from .fredclient import FREDClient
+    from .postgreclient import PostgreDBClient
 
 
 class AceDB:
 
-    def __init__(self):
+    def __init__(self, min_connections: int = None, max_connections: int = None):
+        """
+        Parameters:
+            min_connections (int, optional): Connections the database pool keeps open.
+                Defaults to the configured value (1).
+            max_connections (int, optional): Upper bound on concurrent database connections.
+                Defaults to the configured value (8).
+        """
         self._config = Config()
-        self._databento_client = DBNClient()
-        self._fred_client = FREDClient()
-        self._database_client = PostgreDBClient(
-            host=self._config.host,
-            port=self._config.port,
-            db_name=self._config.db_name,
-            username=self._config.username,
-            password=self._config.password,
-        )
+        self._ledger = SpendLedger()
+        self._min_connections = min_connections or self._config.min_connections
+        self._max_connections = max_connections or self._config.max_connections
+        # the clients are created on first use, see _get_client
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    @property
+    def _databento_client(self) -> DBNClient:
+        def create():
+            from .dbnclient import DBNClient
+
+            return DBNClient(
+                metadata_ttl=timedelta(hours=self._config.metadata_ttl_hours)
+            )
+
+        return self._get_client("databento", create)
+
+    @property
+    def _fred_client(self) -> FREDClient:
+        def create():
+            from .fredclient import FREDClient
+
+            return FREDClient(
+                requests_per_minute=self._config.fred_requests_per_minute,
+                retries=self._config.fetch_retries,
+            )
+
+        return self._get_client("fred", create)
+
+    @property
+    def _database_client(self) -> PostgreDBClient:
+        def create():
+            from .postgreclient import PostgreDBClient
+
+            return PostgreDBClient(
+                host=self._config.host,
+                port=self._config.port,
+                db_name=self._config.db_name,
+                username=self._config.username,
+                password=self._config.password,
+                min_connections=self._min_connections,
+                max_connections=self._max_connections,
+            )
+
+        return self._get_client("database", create)
+
+    def _get_client(self, name: str, create):
+        """
+        Get a client, creating it on first use. Clients are shared between threads,
+        so creation is locked to build each one only once.
+        """
+        client = self._clients.get(name)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = create()
+        return client
 
     def get_data(
         self,
@@ -40,6 +109,16 @@ class AceDB:
         download: bool = False,
         path: str = None,
         filetype: str = "csv",
+        stream: bool = False,
+        chunk_size: int = 100_000,
+        fixed_prices: bool = False,
+        parallel: int = None,
+        result_type: str = "pandas",
+        interactive: bool = None,
+        max_cost: float = None,
+        as_of: str = None,
+        columns: List[str] = None,
+        last: int = None,
         **kwargs,
     ):
         """
@@ -57,6 +136,25 @@ class AceDB:
             download (bool, optional): Whether to download the data to a file. Defaults to False.
             path (str, optional): Path to save the downloaded data.
             filetype (str, optional): File format for downloaded data. Defaults to "csv".
+            stream (bool, optional): Whether to return an iterator of DataFrame chunks per schema/symbol
+                instead of a single DataFrame. Defaults to False.
+            chunk_size (int, optional): Number of rows per chunk when streaming. Defaults to 100_000.
+            fixed_prices (bool, optional): Whether new Databento tables store prices as raw int64
+                fixed-point values (1e-9 units) instead of floats. Defaults to False.
+            parallel (int, optional): Number of connections used to read each schema, split into
+                (symbol group x time slice) shards. Defaults to one query per schema.
+            result_type (str, optional): Type of the returned data: "pandas", "polars", "lazy"
+                (Polars LazyFrame) or "arrow" (pyarrow Table). Defaults to "pandas".
+            interactive (bool, optional): Whether to prompt before spending on Databento. When
+                False, requests are approved within the configured budgets. Defaults to the
+                configured value, or True.
+            max_cost (float, optional): Maximum Databento spend for this call. Defaults to the
+                configured max_cost_per_call.
+            as_of (str, optional): For FRED, return each observation as it was known on this date,
+                or its latest value with "latest". Defaults to every vintage.
+            columns (List[str], optional): For FRED, the columns to return, some of "realtime_start",
+                "date" and "value". Defaults to all.
+            last (int, optional): For FRED, only return the last N observation dates.
             **kwargs: Additional arguments to pass to the underlying methods.
 
         Returns:
@@ -66,8 +164,19 @@ class AceDB:
             ValueError: If the dataset is not found.
         """
 
+        from dateutil import parser
+
+        from .postgreclient import RESULT_TYPES
+
+        if result_type not in RESULT_TYPES:
+            raise ValueError(
+                f"Unknown result_type {result_type}, expected one of {RESULT_TYPES}."
+            )
+
         start = parser.parse(start) if start else 0
         end = parser.parse(end) if end else None
+        if as_of and as_of != "latest":
+            as_of = parser.parse(as_of).date()
 
         dataset_exists = self._check_dataset(dataset)
         if dataset_exists is None:
@@ -88,6 +197,13 @@ class AceDB:
                 download=download,
                 path=path,
                 filetype=filetype,
+                stream=stream,
+                chunk_size=chunk_size,
+                fixed_prices=fixed_prices,
+                parallel=parallel,
+                result_type=result_type,
+                interactive=interactive,
+                max_cost=max_cost,
             )
             return data
         elif dataset_exists == "FRED":
@@ -99,6 +215,12 @@ class AceDB:
                 download=download,
                 path=path,
                 filetype=filetype,
+                stream=stream,
+                chunk_size=chunk_size,
+                result_type=result_type,
+                as_of=as_of,
+                columns=columns,
+                last=last,
             )
             return data
         pass
@@ -116,6 +238,13 @@ class AceDB:
         download: bool = False,
         path: str = None,
         filetype: str = "csv",
+        stream: bool = False,
+        chunk_size: int = 100_000,
+        fixed_prices: bool = False,
+        parallel: int = None,
+        result_type: str = "pandas",
+        interactive: bool = None,
+        max_cost: float = None,
     ):
         """
         Retrieve data from Databento or local database based on specified parameters.
@@ -132,6 +261,16 @@ class AceDB:
             download (bool, optional): Whether to download the data to a file. Defaults to False.
             path (str, optional): Path to save the downloaded data.
             filetype (str, optional): File format for downloaded data. Defaults to "csv".
+            stream (bool, optional): Whether to return an iterator of DataFrame chunks per schema. Defaults to False.
+            chunk_size (int, optional): Number of rows per chunk when streaming. Defaults to 100_000.
+            fixed_prices (bool, optional): Whether new tables store prices as raw int64 fixed-point
+                values instead of floats. Defaults to False.
+            parallel (int, optional): Number of connections used to read each schema. Defaults to one.
+            result_type (str, optional): "pandas", "polars", "lazy" or "arrow". Defaults to "pandas".
+            interactive (bool, optional): Whether to prompt for cost approval. Defaults to the
+                configured value, or True.
+            max_cost (float, optional): Budget for this call. Defaults to the configured
+                max_cost_per_call.
 
         Returns:
             Dict: Data organized by schema, with each schema mapping to retrieved data.
@@ -139,6 +278,8 @@ class AceDB:
         Raises:
             ValueError: If the provided schema is not found in Databento or if stype_in
                        is not 'parent' when using .OPT or .FUT symbols.
+            Exception: If a Databento request failed. The data of the other requests
+                is stored, and the failed ranges are fetched again on the next call.
         """
 
         symbols = symbols if isinstance(symbols, list) else [symbols]
@@ -151,8 +292,13 @@ class AceDB:
                     self._database_client._create_table(
                         sql_schema=dataset,
                         table_name=schema,
-                        col_dict=self._databento_client._get_col_dict(schema),
+                        col_dict=self._databento_client._get_col_dict(
+                            schema, fixed_prices=fixed_prices
+                        ),
+                        partition_interval=self._config.partition_interval,
                     )
+                else:
+                    self._database_client._ensure_table_indexes(dataset, schema)
             else:
                 raise ValueError(f"Schema {schema} not found in Databento.")
 
@@ -160,13 +306,13 @@ class AceDB:
         if not use_databento:
             print("Not sourcing missing data from Databento.")
 
-            symbols = self._databento_client._resolve_symbology(
+            symbols = self._resolve_symbols(
                 dataset=dataset,
                 symbols=symbols,
                 stype_in=stype_in,
                 stype_out=stype_out,
-                start_date=start,
-                end_date=end,
+                start=start,
+                end=end,
             )
             results = self.retrieve_dbn_from_database(
                 dataset=dataset,
@@ -174,9 +320,14 @@ class AceDB:
                 symbols=symbols,
                 start=start,
                 end=end,
+                stream=stream,
+                chunk_size=chunk_size,
+                parallel=parallel,
+                result_type=result_type,
             )
         # using databento
         else:
+            retrieve_symbols = symbols
             # OPT FUT control flow
             if any(item.endswith((".OPT", ".FUT")) for item in symbols):
                 if stype_in != "parent":
@@ -187,118 +338,40 @@ class AceDB:
                 symbols = [
                     symbol for symbol in symbols if symbol.endswith((".FUT", ".OPT"))
                 ]
-                results = {}
-
-                for schema in schemas:
-                    for symbol in symbols:
-                        print(f"Processing symbol {symbol}...")
-                        ranges = self._database_client.retrieve_ranges(
-                            sql_schema=dataset, table_name=schema, symbol=symbol
-                        )
-                        missing_ranges = self._get_missing_ranges(
-                            source_ranges=ranges,
-                            requested_range=(start, end),
-                        )
-                        total_cost = self._databento_client._get_cost(
-                            dataset=dataset,
-                            symbol=symbol,
-                            schema=schema,
-                            ranges=missing_ranges,
-                            stype_in=stype_in,
-                        )
-                        print(f"Cost of {total_cost} for {schema} and {symbol}.")
-                        if total_cost > 0 and self._ask_yn(
-                            f"Cost of {total_cost} for {schema} and {symbol}. Proceed? Type y or n and then press Enter: "
-                        ):
-                            data = self._databento_client.get_data(
-                                dataset=dataset,
-                                schema=schema,
-                                symbol=symbol,
-                                ranges=missing_ranges,
-                                stype_in=stype_in,
-                            )
-                            self._database_client._insert_data(
-                                sql_schema=dataset,
-                                table_name=schema,
-                                data=data,
-                            )
-                            self._database_client._append_ranges(
-                                sql_schema=dataset,
-                                table_name=schema,
-                                symbol=symbol,
-                                ranges=missing_ranges,
-                            )
-                        else:
-                            print(f"Skipping {schema} and {symbol}.")
-                            continue
-
-                child_symbols = self._databento_client._resolve_symbology(
+
+            tasks = self._plan_fetches(
+                dataset=dataset,
+                schemas=schemas,
+                symbols=symbols,
+                start=start,
+                end=end,
+                stype_in=stype_in,
+                interactive=interactive,
+                max_cost=max_cost,
+            )
+            self._execute_fetches(dataset=dataset, tasks=tasks, stype_in=stype_in)
+
+            if stype_in == "parent":
+                retrieve_symbols = self._resolve_symbols(
                     dataset=dataset,
                     symbols=symbols,
                     stype_in=stype_in,
                     stype_out=stype_out,
-                    start_date=start,
-                    end_date=end,
-                )
-                print(len(child_symbols))
-                results = self.retrieve_dbn_from_database(
-                    dataset=dataset,
-                    schemas=schemas,
-                    symbols=child_symbols,
                     start=start,
                     end=end,
                 )
 
-            # Standard symbol control flow
-            else:
-
-                results = {}
-                for schema in schemas:
-                    for symbol in symbols:
-                        ranges = self._database_client.retrieve_ranges(
-                            sql_schema=dataset, table_name=schema, symbol=symbol
-                        )
-                        missing_ranges = self._get_missing_ranges(
-                            source_ranges=ranges,
-                            requested_range=(start, end),
-                        )
-                        total_cost = self._databento_client._get_cost(
-                            dataset=dataset,
-                            symbol=symbol,
-                            schema=schema,
-                            ranges=missing_ranges,
-                            stype_in=stype_in,
-                        )
-                        if total_cost > 0 and self._ask_yn(
-                            f"Cost of {total_cost} for {schema} and {symbol}. Proceed? (y/n): "
-                        ):
-                            data = self._databento_client.get_data(
-                                dataset=dataset,
-                                schema=schema,
-                                symbol=symbol,
-                                ranges=missing_ranges,
-                            )
-                            self._database_client._insert_data(
-                                sql_schema=dataset,
-                                table_name=schema,
-                                data=data,
-                            )
-                            self._database_client._append_ranges(
-                                sql_schema=dataset,
-                                table_name=schema,
-                                symbol=symbol,
-                                ranges=missing_ranges,
-                            )
-                        else:
-                            print(f"Skipping {schema} and {symbol}.")
-                            continue
-                    results[schema] = self._database_client._retrieve_data(
-                        sql_schema=dataset,
-                        table_name=schema,
-                        symbol=symbols,
-                        start=start,
-                        end=end,
-                    )
+            results = self.retrieve_dbn_from_database(
+                dataset=dataset,
+                schemas=schemas,
+                symbols=retrieve_symbols,
+                start=start,
+                end=end,
+                stream=stream,
+                chunk_size=chunk_size,
+                parallel=parallel,
+                result_type=result_type,
+            )
 
         if download:
             self._download_data(
@@ -309,7 +382,348 @@ class AceDB:
 
         return results
 
-    def retrieve_dbn_from_database(self, dataset, schemas, symbols, start, end):
+    def _resolve_symbols(
+        self,
+        dataset: str,
+        symbols: List[str],
+        stype_in: str,
+        stype_out: str,
+        start: datetime,
+        end: datetime,
+    ) -> List[str]:
+        """
+        Resolve .OPT and .FUT parent symbols into their child symbols; other symbols
+        are returned as they are.
+
+        Children are read from "time".symbology. Windows of a parent that have not
+        been resolved yet are resolved with Databento's symbology API first, which
+        is free, so this also happens when use_databento is False. Resolved windows
+        are recorded in "time".time_range under the table "symbology", which
+        get_ranges() leaves out.
+        """
+        parents = [symbol for symbol in symbols if symbol.endswith((".FUT", ".OPT"))]
+        if not parents:
+            return symbols
+
+        resolved = self._database_client.retrieve_ranges_bulk(
+            sql_schema=dataset,
+            table_name=SYMBOLOGY_TABLE,
+            symbols=parents,
+        )
+        for parent, ranges in resolved.items():
+            for window_start, window_end in self._get_missing_ranges(
+                source_ranges=ranges, requested_range=(start, end)
+            ):
+                print(f"Resolving {parent} from {window_start} to {window_end}...")
+                mappings = self._databento_client._resolve_parent(
+                    dataset=dataset,
+                    parent=parent,
+                    stype_in=stype_in,
+                    stype_out=stype_out,
+                    start_date=window_start,
+                    end_date=window_end,
+                )
+                self._database_client._insert_symbology(dataset, parent, mappings)
+                self._database_client._append_ranges(
+                    sql_schema=dataset,
+                    table_name=SYMBOLOGY_TABLE,
+                    symbol=parent,
+                    ranges=[(window_start, window_end)],
+                )
+
+        return self._database_client._retrieve_children(
+            sql_schema=dataset, parents=parents, start=start, end=end
+        )
+
+    def _plan_fetches(
+        self,
+        dataset: str,
+        schemas: List[str],
+        symbols: List[str],
+        start: datetime,
+        end: datetime,
+        stype_in: str,
+        interactive: bool = None,
+        max_cost: float = None,
+    ) -> List[FetchTask]:
+        """
+        Find the ranges missing from the database for every schema and symbol,
+        price them with batched cost queries, and approve them once as a whole.
+        Returns a fetch task per approved missing range, covering every symbol that
+        misses it (in batches of symbols_per_request).
+
+        Stored ranges come from the in-process range index, which is loaded once
+        per symbol and updated when ranges are appended or compacted, so repeat
+        plans do not query "time".time_range.
+        """
+        # (schema, start, end) -> symbols missing that range
+        missing = defaultdict(list)
+        for schema in schemas:
+            stored_ranges = self._database_client.retrieve_ranges_bulk(
+                sql_schema=dataset, table_name=schema, symbols=symbols
+            )
+            for symbol, ranges in stored_ranges.items():
+                for missing_start, missing_end in self._get_missing_ranges(
+                    source_ranges=ranges,
+                    requested_range=(start, end),
+                ):
+                    missing[(schema, missing_start, missing_end)].append(symbol)
+
+        if not missing:
+            print("All requested data is already in the database.")
+            return []
+
+        costs = self._databento_client._get_costs(
+            dataset=dataset, requests=missing, stype_in=stype_in
+        )
+
+        total_cost = sum(costs.values())
+        print(f"Missing data for {dataset}:")
+        for schema in schemas:
+            keys = [key for key in missing if key[0] == schema]
+            if not keys:
+                continue
+            schema_symbols = {symbol for key in keys for symbol in missing[key]}
+            schema_cost = sum(costs[key] for key in keys)
+            print(
+                f"  {schema}: {len(schema_symbols)} symbols, {len(keys)} ranges, cost {schema_cost:.4f}"
+            )
+        print(f"  Total cost: {total_cost:.4f}")
+
+        approved = self._approve_plan(
+            dataset=dataset,
+            missing=missing,
+            costs=costs,
+            interactive=interactive,
+            max_cost=max_cost,
+        )
+
+        # symbols missing the same range are fetched together
+        batch_size = self._config.symbols_per_request
+        tasks = []
+        for key in approved:
+            schema, missing_start, missing_end = key
+            for i in range(0, len(missing[key]), batch_size):
+                tasks.append(
+                    FetchTask(
+                        schema,
+                        missing[key][i : i + batch_size],
+                        [(missing_start, missing_end)],
+                    )
+                )
+        return tasks
+
+    def _approve_plan(
+        self,
+        dataset: str,
+        missing: Dict[Tuple[str, datetime, datetime], List[str]],
+        costs: Dict[Tuple[str, datetime, datetime], float],
+        interactive: bool = None,
+        max_cost: float = None,
+    ) -> List[Tuple[str, datetime, datetime]]:
+        """
+        Decide which planned requests to download.
+
+        Requests are kept in plan order while they fit in the per-call budget and
+        what is left of the daily budget; the rest are skipped. The kept requests
+        are approved automatically below auto_approve_below, by prompting when
+        interactive, and otherwise only if a budget is configured. Approved spend
+        is recorded in the spend ledger.
+        """
+        if interactive is None:
+            interactive = self._config.interactive
+        if interactive is None:
+            # prompt by default, including in notebooks where stdin is not a terminal
+            interactive = True
+        if max_cost is None:
+            max_cost = self._config.max_cost_per_call
+        daily_budget = self._config.max_cost_per_day
+
+        def describe(key):
+            schema, start, end = key
+            return {
+                "schema": schema,
+                "start": start,
+                "end": end,
+                "symbols": len(missing[key]),
+                "cost": costs[key],
+            }
+
+        log_event(
+            "plan",
+            dataset=dataset,
+            total_cost=sum(costs.values()),
+            requests=[describe(key) for key in missing],
+        )
+
+        remaining = max_cost if max_cost is not None else float("inf")
+        if daily_budget is not None:
+            remaining = min(remaining, daily_budget - self._ledger.spent_today())
+
+        approved, skipped = [], []
+        planned_cost = 0.0
+        for key in missing:
+            if planned_cost + costs[key] <= remaining:
+                approved.append(key)
+                planned_cost += costs[key]
+            else:
+                skipped.append(key)
+        for key in skipped:
+            log_event("skip", dataset=dataset, reason="budget", **describe(key))
+        if skipped:
+            print(f"Skipping {len(skipped)} requests that exceed the budget.")
+
+        def decline(reason):
+            print(f"Skipping download: {reason}.")
+            for key in approved:
+                log_event("skip", dataset=dataset, reason=reason, **describe(key))
+            return []
+
+        if not approved:
+            return []
+        if planned_cost <= 0:
+            decision = "free"
+        elif (
+            self._config.auto_approve_below is not None
+            and planned_cost <= self._config.auto_approve_below
+        ):
+            decision = "auto"
+        elif interactive:
+            if not self._ask_yn(
+                f"Cost of {planned_cost:.4f} for {len(approved)} requests. Proceed? (y/n): "
+            ):
+                return decline("declined")
+            decision = "user"
+        elif max_cost is None and daily_budget is None:
+            return decline("no budget configured for non-interactive mode")
+        else:
+            decision = "budget"
+
+        if planned_cost > 0 and not self._ledger.reserve(planned_cost, daily_budget):
+            return decline("daily budget exhausted")
+
+        log_event(
+            "approve",
+            dataset=dataset,
+            decision=decision,
+            cost=planned_cost,
+            requests=len(approved),
+        )
+        return approved
+
+    def _execute_fetches(
+        self, dataset: str, tasks: List[FetchTask], stype_in: str
+    ) -> None:
+        """
+        Download the tasks from Databento to DBN files and stream them into the
+        database in chunks through the ingestion pipeline. A range is only recorded
+        once its data has been inserted, so failed tasks are fetched again on the
+        next request.
+
+        Raises:
+            ValueError: If a task could not be fetched or stored, after the other
+                tasks have finished.
+        """
+        if not tasks:
+            return
+
+        price_types = {
+            schema: self._price_type(dataset, schema)
+            for schema in {task.schema for task in tasks}
+        }
+
+        def fetch(task: FetchTask) -> List[Path]:
+            return self._databento_client.download(
+                dataset=dataset,
+                schema=task.schema,
+                symbol=task.symbols,
+                ranges=task.ranges,
+                stype_in=stype_in,
+                directory=self._config.download_dir,
+            )
+
+        def write(task: FetchTask, paths: List[Path]) -> None:
+            key = self._databento_client._get_natural_key(task.schema)
+            # each chunk is decoded and copied on its own, so memory use does not
+            # grow with the size of the download
+            for i, chunk in enumerate(
+                self._databento_client.iter_chunks(
+                    paths,
+                    price_type=price_types[task.schema],
+                    chunk_rows=self._config.ingest_chunk_rows,
+                )
+            ):
+                # without a natural key, rows a failed attempt stored are removed
+                # with the first chunk, as the range is only recorded at the end
+                self._database_client._insert_data(
+                    sql_schema=dataset,
+                    table_name=task.schema,
+                    data=chunk,
+                    conflict_key=key,
+                    replace_symbols=task.symbols,
+                    replace_ranges=task.ranges if key is None and i == 0 else None,
+                )
+            self._database_client._append_ranges(
+                sql_schema=dataset,
+                table_name=task.schema,
+                symbol=task.symbols,
+                ranges=task.ranges,
+            )
+
+        def cleanup(task: FetchTask, paths: List[Path]) -> None:
+            self._databento_client.remove_files(paths)
+
+        # leave a pooled connection free for other work while the writers run
+        writers = max(
+            min(self._config.writer_workers, self._database_client.max_connections - 1),
+            1,
+        )
+        pipeline = IngestPipeline(
+            fetch=fetch,
+            write=write,
+            cleanup=cleanup,
+            downloaders=self._config.download_workers,
+            writers=writers,
+            queue_size=self._config.pipeline_queue_size,
+            retries=self._config.fetch_retries,
+        )
+        failed = pipeline.run(tasks)
+        log_event(
+            "fetch",
+            dataset=dataset,
+            requests=len(tasks),
+            failed=[
+                {
+                    "schema": task.schema,
+                    "symbols": task.symbols,
+                    "error": str(error),
+                }
+                for task, error in failed
+            ],
+        )
+        if failed:
+            if len(failed) == 1:
+                raise failed[0][1]
+            raise ValueError(
+                f"{len(failed)} of {len(tasks)} Databento requests failed: "
+                + "; ".join(
+                    f"{task} {task.ranges[0][0]} - {task.ranges[0][1]}: {error}"
+                    for task, error in failed
+                )
+            )
+
+    def retrieve_dbn_from_database(
+        self,
+        dataset,
+        schemas,
+        symbols,
+        start,
+        end,
+        stream: bool = False,
+        chunk_size: int = 100_000,
+        parallel: int = None,
+        result_type: str = "pandas",
+    ):
         """
         Retrieve data from the database for the given dataset, schemas, and symbols.
 
@@ -319,6 +733,12 @@ class AceDB:
             symbols (List[str] | str): Symbol(s) to retrieve data for.
             start (str): Start date/time for the data range.
             end (str): End date/time for the data range.
+            stream (bool, optional): Whether to return an iterator of DataFrame chunks per schema,
+                ordered by ts_event. Defaults to False.
+            chunk_size (int, optional): Number of rows per chunk when streaming. Defaults to 100_000.
+            parallel (int, optional): Number of connections used to read each schema, split into
+                (symbol group x time slice) shards. Ignored when streaming. Defaults to one.
+            result_type (str, optional): "pandas", "polars", "lazy" or "arrow". Defaults to "pandas".
 
         Returns:
             Dict: Retrieved data organized by schema.
@@ -326,35 +746,66 @@ class AceDB:
 
         schemas = schemas if isinstance(schemas, list) else [schemas]
         symbols = symbols if isinstance(symbols, list) else [symbols]
-        results = {}
 
-        if len(symbols) > 100:
-            # more efficient querying for large symbol
-            self._database_client._create_temp_symbols(
-                table_name="temp_symbols", symbols=symbols
-            )
-            for schema in schemas:
-                data = self._database_client._retrieve_temp_symbols(
+        def retrieve(schema):
+            if parallel and parallel > 1 and not stream:
+                return self._database_client._retrieve_data(
                     sql_schema=dataset,
                     table_name=schema,
-                    temp_table_name="temp_symbols",
+                    symbol=symbols,
                     start=start,
                     end=end,
+                    parallel=parallel,
+                    result_type=result_type,
                 )
-                results[schema] = data
 
-        else:
-            for schema in schemas:
-                data = self._database_client._retrieve_data(
+            if len(symbols) > 100:
+                # more efficient querying for large symbol
+                if stream:
+                    return self._database_client._stream_temp_symbols(
+                        sql_schema=dataset,
+                        table_name=schema,
+                        symbols=symbols,
+                        start=start,
+                        end=end,
+                        chunk_size=chunk_size,
+                        result_type=result_type,
+                    )
+                return self._database_client._retrieve_temp_symbols(
+                    sql_schema=dataset,
+                    table_name=schema,
+                    symbols=symbols,
+                    start=start,
+                    end=end,
+                    result_type=result_type,
+                )
+
+            if stream:
+                return self._database_client._stream_data(
                     sql_schema=dataset,
                     table_name=schema,
                     symbol=symbols,
                     start=start,
                     end=end,
+                    chunk_size=chunk_size,
+                    result_type=result_type,
                 )
-                results[schema] = data
+            return self._database_client._retrieve_data(
+                sql_schema=dataset,
+                table_name=schema,
+                symbol=symbols,
+                start=start,
+                end=end,
+                result_type=result_type,
+            )
 
-        return results
+        if stream or len(schemas) == 1:
+            return {schema: retrieve(schema) for schema in schemas}
+
+        # schemas are independent tables, so they are read on separate pooled connections
+        workers = min(len(schemas), self._database_client.max_connections)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(schemas, executor.map(retrieve, schemas)))
 
     def get_FRED_data(
         self,
@@ -365,17 +816,37 @@ class AceDB:
         download: bool = False,
         path: str = None,
         filetype: str = "csv",
+        stream: bool = False,
+        chunk_size: int = 100_000,
+        result_type: str = "pandas",
+        as_of: date | str = None,
+        columns: List[str] = None,
+        last: int = None,
     ):
         """
         Retrieve data from FRED and store it in the database.
+
+        Series are stored as (realtime_start, date, value) rows, one per observation
+        and release. Tables in the old layout of one column per observation date are
+        migrated on first use. Stored series are refreshed incrementally from their
+        sync point in "time".fred_sync, and not fetched at all if FRED has not
+        updated them since.
         Parameters:
             dataset (str): The name of the dataset (should be "FRED").
             symbols (List[str] | str): Symbol(s) to retrieve data for.
-            start (str, optional): Start date/time for the data range.
-            end (str, optional): End date/time for the data range.
+            start (datetime, optional): First observation date to return.
+            end (datetime, optional): Last observation date to return.
             download (bool, optional): Whether to download the data to a file. Defaults to False.
             path (str, optional): Path to save the downloaded data.
             filetype (str, optional): File format for downloaded data. Defaults to "csv".
+            stream (bool, optional): Whether to return an iterator of DataFrame chunks per symbol. Defaults to False.
+            chunk_size (int, optional): Number of rows per chunk when streaming. Defaults to 100_000.
+            result_type (str, optional): "pandas", "polars", "lazy" or "arrow". Defaults to "pandas".
+            as_of (date | str, optional): Return each observation as it was known on this date,
+                or its latest value with "latest". Defaults to every vintage.
+            columns (List[str], optional): Columns to return, some of "realtime_start", "date"
+                and "value". Defaults to all.
+            last (int, optional): Only return the last N observation dates, e.g. for dashboards.
         Returns:
             Dict: Retrieved data organized by symbol.
         Raises:
@@ -384,53 +855,33 @@ class AceDB:
 
         symbols = symbols if isinstance(symbols, list) else [symbols]
 
-        results = {}
+        self._sync_FRED_series(symbols)
 
+        results = {}
         for symbol in symbols:
-            print(f"Processing symbol {symbol}...")
-            if not self._fred_client._validate_symbol(symbol):
-                raise ValueError(f"Symbol {symbol} not found in FRED.")
-            elif not self._database_client._check_table_in_database("FRED", symbol):
-                data, col_dict = self._fred_client.get_data(symbol)
-                self._database_client._create_table(
+            if stream:
+                results[symbol] = self._database_client._stream_fred(
                     sql_schema="FRED",
                     table_name=symbol,
-                    col_dict=col_dict,
-                )
-                self._database_client._insert_data(
-                    sql_schema="FRED",
-                    table_name=symbol,
-                    data=data,
+                    as_of=as_of,
+                    start=start,
+                    end=end,
+                    columns=columns,
+                    last=last,
+                    chunk_size=chunk_size,
+                    result_type=result_type,
                 )
             else:
-                last_time = self._database_client._get_max_time(
+                results[symbol] = self._database_client._retrieve_fred(
                     sql_schema="FRED",
                     table_name=symbol,
+                    as_of=as_of,
+                    start=start,
+                    end=end,
+                    columns=columns,
+                    last=last,
+                    result_type=result_type,
                 )
-                data, col_dict = self._fred_client.get_data(
-                    symbol,
-                )
-                if last_time is not None:
-                    data = data[data["ts_event"] > last_time]
-
-                if data.empty:
-                    print(f"No new data for {symbol}.")
-                else:
-                    self._database_client._ensure_columns_exist(
-                        sql_schema="FRED",
-                        table_name=symbol,
-                        col_dict=col_dict,
-                    )
-                    self._database_client._insert_data(
-                        sql_schema="FRED",
-                        table_name=symbol,
-                        data=data,
-                    )
-                    print(f"Inserted {len(data)} rows for {symbol}.")
-
-            results[symbol] = self._database_client._retrieve_data(
-                sql_schema="FRED", table_name=symbol
-            )
         if download:
             self._download_data(
                 results_dict=results,
@@ -440,6 +891,123 @@ class AceDB:
 
         return results
 
+    def _sync_FRED_series(self, symbols: List[str]) -> None:
+        """
+        Bring the stored FRED series up to date through the ingestion pipeline.
+
+        Fetcher threads share the FRED client's rate limit. Each one requests the
+        series info, which validates the symbol and tells if the series changed
+        since its sync point in "time".fred_sync, and then only what FRED has
+        published since. Writer threads insert the series over pooled
+        connections. Tables stored before syncs were recorded are fetched from
+        their latest realtime_start, and those of the requested series still in
+        the old wide layout are migrated first, see migrate_fred.
+
+        Raises:
+            ValueError: If a symbol is not found in FRED or could not be fetched,
+                or its table has the old layout and is owned by another role.
+        """
+        from .fredclient import NATURAL_KEY
+
+        database = self._database_client
+        existing = {table for _, table in database._list_tables("FRED")}
+        wide_tables = database._list_wide_fred_tables("FRED", symbols)
+        for table, owned in wide_tables.items():
+            if not owned:
+                raise ValueError(
+                    f"FRED table {table} has the old layout and is owned by another "
+                    "role. Run acedb migrate-fred as its owner."
+                )
+        for table in wide_tables:
+            database._migrate_fred_to_long("FRED", table)
+        syncs = database._get_fred_syncs(symbols)
+
+        def fetch(symbol: str):
+            try:
+                info = self._fred_client._get_series_info(symbol)
+            except ValueError as error:
+                if self._fred_client._is_transient(error):
+                    raise
+                raise ValueError(f"Symbol {symbol} not found in FRED.") from error
+
+            table = database._convert_for_SQL(symbol)
+            last_updated = info.get("last_updated")
+            sync = syncs.get(table)
+            if sync is not None and sync[1] == last_updated:
+                print(f"{symbol} is up to date.")
+                return None
+
+            if sync is not None:
+                vintages, _, since = sync
+            else:
+                vintages = None
+                since = None
+                if table in existing:
+                    since = database._get_fred_sync_point("FRED", symbol)
+
+            data, vintages = self._fred_client.get_data(
+                symbol, since=since, vintages=vintages
+            )
+            return data, vintages, since, last_updated
+
+        def write(symbol: str, fetched) -> None:
+            if fetched is None:
+                return
+            data, vintages, since, last_updated = fetched
+            if database._convert_for_SQL(symbol) not in existing:
+                database._create_fred_table("FRED", symbol)
+            if since is not None and vintages and not data.empty:
+                stored = database._retrieve_fred(
+                    sql_schema="FRED",
+                    table_name=symbol,
+                    as_of="latest",
+                    start=data["date"].min(),
+                )
+                data = self._fred_client._drop_unchanged(data, stored)
+
+            if data.empty:
+                print(f"No new data for {symbol}.")
+            else:
+                database._insert_data(
+                    sql_schema="FRED",
+                    table_name=symbol,
+                    data=data,
+                    conflict_key=NATURAL_KEY,
+                )
+            database._set_fred_sync(
+                symbol,
+                vintages=vintages,
+                last_updated=last_updated,
+                sync_point=database._get_fred_sync_point("FRED", symbol),
+            )
+
+        writers = max(min(self._config.writer_workers, database.max_connections - 1), 1)
+        # FRED requests are retried by the client, which does not retry unknown symbols
+        pipeline = IngestPipeline(
+            fetch=fetch,
+            write=write,
+            downloaders=self._config.fred_workers,
+            writers=writers,
+            queue_size=self._config.pipeline_queue_size,
+            retries=0,
+        )
+        failed = pipeline.run(list(dict.fromkeys(symbols)))
+        log_event(
+            "fetch",
+            dataset="FRED",
+            requests=len(symbols),
+            failed=[
+                {"symbols": [symbol], "error": str(error)} for symbol, error in failed
+            ],
+        )
+        if failed:
+            if len(failed) == 1:
+                raise failed[0][1]
+            raise ValueError(
+                f"{len(failed)} of {len(symbols)} FRED series failed: "
+                + "; ".join(f"{symbol}: {error}" for symbol, error in failed)
+            )
+
     def get_ranges(self, dataset: str = None, schema: str = None, symbol: str = None):
         """
         Retrieve the ranges of data for a given dataset, schema, and symbol.
@@ -450,27 +1018,203 @@ class AceDB:
         Returns:
             Dict: A dictionary containing the ranges of data for the specified dataset, schema, and symbol.
         """
-        unique_combos = self._database_client._retrieve_existing_ranges()
-        unique_combos = unique_combos.to_dict(orient="records")
+        ranges = self._database_client._retrieve_all_ranges(
+            sql_schema=dataset, table_name=schema, symbol=symbol
+        )
         result = {}
-        for item in unique_combos:
-            schema = item["schema"]
-            table = item["table"]
-            symbol = item["symbol"]
-            result.setdefault(schema, {}).setdefault(table, {})[symbol] = []
-
-        for schema, tables in result.items():
-            for table, symbols in tables.items():
-                for symbol in symbols.keys():
-                    ranges = self._database_client.retrieve_ranges(
-                        sql_schema=schema, table_name=table, symbol=symbol
-                    )
-                    if ranges:
-                        result[schema][table][symbol] = self._merge_ranges(ranges)
+        for (sql_schema, table, range_symbol), symbol_ranges in ranges.items():
+            if table == SYMBOLOGY_TABLE:
+                # resolved symbology windows, not stored data
+                continue
+            result.setdefault(sql_schema.replace("_", "."), {}).setdefault(
+                table.replace("_", "-"), {}
+            )[range_symbol] = self._merge_ranges(symbol_ranges)
 
         return result
 
-    def insert(self, dataset: str, schema: str, symbol: str, data: pd.DataFrame):
+    def refresh_metadata(self) -> None:
+        """
+        Clear the cached Databento metadata (datasets, schemas and fields), so it
+        is fetched again on next use.
+        """
+        self._databento_client.refresh_metadata()
+        print("Metadata cache cleared.")
+
+    def compact_ranges(self, dataset: str = None, schema: str = None) -> int:
+        """
+        Merge overlapping and adjacent stored ranges. Appending ranges already
+        compacts the symbols it touches, so this is only needed for ranges stored
+        by older versions.
+        Parameters:
+            dataset (str, optional): Only compact ranges of this dataset.
+            schema (str, optional): Only compact ranges of this schema.
+        Returns:
+            int: The number of range rows removed.
+        """
+        removed = self._database_client.compact_ranges(
+            sql_schema=dataset, table_name=schema
+        )
+        print(f"Removed {removed} range rows.")
+        return removed
+
+    def export(
+        self,
+        dataset: str,
+        path: str,
+        schemas: List[str] | str = None,
+        symbols: List[str] | str = None,
+        start: str = None,
+        end: str = None,
+        partition_by: List[str] = None,
+        compression: str = "zstd",
+        compression_level: int = None,
+        row_group_size: int = 1_000_000,
+        max_rows_per_file: int = None,
+        chunk_size: int = 100_000,
+    ) -> List[Path]:
+        """
+        Export stored data to Hive-partitioned Parquet datasets, e.g.
+        path/ohlcv-1m/symbol=AAPL/date=2024-01-02/part-0.parquet for Databento and
+        path/symbol=GDP/part-0.parquet for FRED.
+
+        Rows are read from the database in chunks of chunk_size rows, ordered by the
+        partition columns, and written as they arrive, so memory use does not grow
+        with the size of the export. Nothing is fetched from Databento or FRED.
+
+        Parameters:
+            dataset (str): The name of the dataset.
+            path (str): Directory to write the datasets to.
+            schemas (List[str] | str, optional): Databento schemas to export. Defaults to all stored.
+            symbols (List[str] | str, optional): Symbols to export. Defaults to all stored.
+            start (str, optional): Start date/time of the exported data.
+            end (str, optional): End date/time of the exported data.
+            partition_by (List[str], optional): Partition columns. "date" is the date of ts_event
+                unless the table has a date column. Defaults to ["symbol", "date"] for Databento
+                and ["symbol"] for FRED.
+            compression (str, optional): "zstd", "lz4", "snappy", "gzip" or "none". Defaults to "zstd".
+            compression_level (int, optional): Compression level. Defaults to the codec's default.
+            row_group_size (int, optional): Rows per Parquet row group. Defaults to 1_000_000.
+            max_rows_per_file (int, optional): Rows per file before starting the next part.
+                Defaults to one file per partition.
+            chunk_size (int, optional): Rows read from the database at a time. Defaults to 100_000.
+        Returns:
+            List[Path]: The written files.
+        """
+        import polars as pl
+        from dateutil import parser
+
+        from .dbnclient import DBNClient
+        from .export import ParquetExporter
+
+        start = parser.parse(start) if start else None
+        end = parser.parse(end) if end else None
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        path = Path(path)
+        database = self._database_client
+
+        def exporter(directory: Path, partitions: List[str]) -> ParquetExporter:
+            return ParquetExporter(
+                directory,
+                partition_by=partitions,
+                compression=compression,
+                compression_level=compression_level,
+                row_group_size=row_group_size,
+                max_rows_per_file=max_rows_per_file,
+            )
+
+        dataset_exists = self._check_dataset(dataset)
+        if dataset_exists == "FRED":
+            if symbols is None:
+                symbols = [table for _, table in database._list_tables("FRED")]
+            partitions = partition_by if partition_by is not None else ["symbol"]
+            writer = exporter(path, partitions)
+            for symbol in symbols:
+                for chunk in database._stream_fred(
+                    sql_schema="FRED",
+                    table_name=symbol,
+                    start=start,
+                    end=end,
+                    chunk_size=chunk_size,
+                    result_type="polars",
+                ):
+                    writer.write(chunk.with_columns(symbol=pl.lit(symbol)))
+            files = writer.close()
+        elif dataset_exists == "Databento":
+            if schemas is None:
+                schemas = [table for _, table in database._list_tables(dataset)]
+            schemas = schemas if isinstance(schemas, list) else [schemas]
+            partitions = (
+                partition_by if partition_by is not None else ["symbol", "date"]
+            )
+            files = []
+            for schema in schemas:
+                writer = exporter(path / schema, partitions)
+                pg_types = database._get_column_types(dataset, schema)
+                query, params = database._build_select_query(
+                    sql_schema=dataset,
+                    table_name=schema,
+                    symbol=symbols,
+                    start=start,
+                    end=end,
+                    order_by=self._export_order(
+                        partitions,
+                        pg_types,
+                        DBNClient._get_natural_key(schema),
+                    ),
+                )
+                for chunk in database._stream_query(
+                    query,
+                    params,
+                    chunk_size,
+                    result_type="polars",
+                    pg_types=pg_types,
+                ):
+                    writer.write(chunk)
+                files += writer.close()
+        else:
+            raise ValueError(f"Dataset {dataset} not found")
+
+        print(f"Exported {len(files)} files to {path}.")
+        return files
+
+    @staticmethod
+    def _export_order(
+        partition_by: List[str], pg_types: Dict[str, str], key: List[str] = None
+    ) -> str:
+        """
+        Build the ORDER BY of an export, which must be ordered by its partition
+        columns. A trailing "date" partition is already ordered by ts_event.
+
+        Many records can share a ts_event, e.g. trades, so rows are then ordered
+        by the table's natural key, or by all columns without one, for every
+        export of the same data to give the same files.
+        """
+        order = []
+        for col in partition_by:
+            if col in pg_types:
+                order.append(f'"{col}"')
+            elif col == "date":
+                order.append("ts_event::date")
+            else:
+                raise ValueError(f"Cannot partition by {col}, it is not a column.")
+        if partition_by and partition_by[-1] == "date" and "date" not in pg_types:
+            order.pop()
+        order.append("ts_event")
+        for col in key or list(pg_types):
+            if col in pg_types and col != "ts_event" and f'"{col}"' not in order:
+                order.append(f'"{col}"')
+        return ", ".join(order)
+
+    def insert(
+        self,
+        dataset: str,
+        schema: str,
+        symbol: str,
+        data: pd.DataFrame,
+        fixed_prices: bool = False,
+        deduplicate: bool = True,
+    ):
         """
         Insert data into the database for a given dataset, schema, and symbol.
         Parameters:
@@ -478,6 +1222,10 @@ class AceDB:
             schema (str): The schema name.
             symbol (str): The symbol to insert data for.
             data (pd.DataFrame): The data to be inserted.
+            fixed_prices (bool, optional): Whether a newly created table stores prices as raw
+                int64 fixed-point values. Defaults to False.
+            deduplicate (bool, optional): Whether to skip rows that are already stored,
+                matched on the schema's natural key (OHLCV, BBO and CBBO). Defaults to True.
         """
 
         dataset = self._check_dataset(dataset)
@@ -489,18 +1237,131 @@ class AceDB:
                 self._database_client._create_table(
                     sql_schema=dataset,
                     table_name=schema,
-                    col_dict=self._databento_client._get_col_dict(schema),
+                    col_dict=self._databento_client._get_col_dict(
+                        schema, fixed_prices=fixed_prices
+                    ),
+                    partition_interval=self._config.partition_interval,
                 )
+            else:
+                self._database_client._ensure_table_indexes(dataset, schema)
             self._database_client._insert_data(
                 sql_schema=dataset,
                 table_name=schema,
                 data=data,
+                conflict_key=(
+                    self._databento_client._get_natural_key(schema)
+                    if deduplicate
+                    else None
+                ),
             )
         elif dataset == "FRED":
             print("No need to insert FRED data. The API is free, just request it.")
         else:
             raise ValueError(f"Dataset {dataset} not found.")
 
+    def migrate_types(
+        self,
+        dataset: str = None,
+        fixed_prices: bool = False,
+        batch_pages: int = 10_000,
+    ) -> None:
+        """
+        Rewrite NUMERIC columns of existing tables to native column types.
+
+        Databento tables get the types of their schema fields, FRED tables
+        DOUBLE PRECISION; other tables are skipped. Rows are copied into a new
+        table in batches and the tables are swapped in one transaction, so
+        ingestion should be paused while a table is migrated. Batching needs
+        PostgreSQL 14 or later, older servers copy each table in one batch.
+
+        Parameters:
+            dataset (str, optional): Only migrate tables of this dataset. Defaults to all.
+            fixed_prices (bool, optional): Whether price columns become raw int64
+                fixed-point values instead of floats. Defaults to False.
+            batch_pages (int, optional): Heap pages copied per batch. Defaults to 10_000.
+        """
+        from .postgreclient import TYPE_MAP
+
+        sql_schema = (
+            self._database_client._convert_for_SQL(dataset) if dataset else None
+        )
+
+        for table_schema, table_name in self._database_client._list_tables(sql_schema):
+            if table_schema == "time":
+                continue
+            schema = table_name.replace("_", "-")
+            if table_schema != "FRED" and not self._databento_client._is_schema(schema):
+                continue
+
+            pg_types = self._database_client._get_column_types(table_schema, table_name)
+            numeric_cols = [
+                col
+                for col, pg_type in pg_types.items()
+                if pg_type.startswith("numeric")
+            ]
+            if not numeric_cols:
+                continue
+
+            if table_schema == "FRED":
+                col_types = {}
+                price_fields = []
+            else:
+                col_dict = self._databento_client._get_col_dict(
+                    schema, fixed_prices=fixed_prices
+                )
+                col_types = {col["name"]: col["type"] for col in col_dict}
+                price_fields = self._databento_client._get_price_fields(schema)
+
+            targets = {}
+            for col in numeric_cols:
+                col_type = TYPE_MAP.get(col_types.get(col, "float64"))
+                if fixed_prices and col in price_fields:
+                    # prices were stored as floats, fixed-point units are 1e-9
+                    targets[col] = (col_type, f'round("{col}" * 1e9)::{col_type}')
+                else:
+                    targets[col] = (col_type, f'"{col}"::{col_type}')
+
+            print(f"Migrating {table_schema}.{table_name}...")
+            self._database_client._migrate_column_types(
+                sql_schema=table_schema,
+                table_name=table_name,
+                targets=targets,
+                batch_pages=batch_pages,
+            )
+
+    def migrate_fred(self) -> int:
+        """
+        Convert FRED tables stored in the old wide layout, a column per
+        observation date, to the long (realtime_start, date, value) layout.
+        Tables owned by another role are skipped.
+
+        Syncing a series migrates its own table, so this is only needed to
+        migrate all of them at once.
+
+        Returns:
+            int: The number of tables migrated.
+        """
+        database = self._database_client
+        migrated = 0
+        for table, owned in database._list_wide_fred_tables("FRED").items():
+            if not owned:
+                print(f"Skipping FRED.{table}, it is owned by another role.")
+                continue
+            database._migrate_fred_to_long("FRED", table)
+            migrated += 1
+        print(f"Migrated {migrated} FRED tables.")
+        return migrated
+
+    def _price_type(self, dataset: str, schema: str) -> str:
+        """
+        Get the price type a Databento table stores, "fixed" for int64 prices.
+        """
+        pg_types = self._database_client._get_column_types(dataset, schema)
+        for col in self._databento_client._get_price_fields(schema):
+            if pg_types.get(col) == "bigint":
+                return "fixed"
+        return "float"
+
     def _check_dataset(self, dataset: str) -> bool:
         """
         Check if the dataset exists in the database.
@@ -510,10 +1371,10 @@ class AceDB:
         if not isinstance(dataset, str):
             raise ValueError("Dataset must be a string.")
 
-        if self._databento_client._validate_dataset(dataset):
-            return "Databento"
-        elif dataset == "FRED":
+        if dataset == "FRED":
             return "FRED"
+        elif self._databento_client._validate_dataset(dataset):
+            return "Databento"
         else:
             print(f"Dataset {dataset} not found in either Databento or FRED.")
             return None
@@ -550,10 +1411,27 @@ class AceDB:
                 self._download_helper(file_path, ext, value)
 
     @staticmethod
-    def _download_helper(file_path: str | Path, ext: str, data: pd.DataFrame) -> None:
+    def _download_helper(
+        file_path: str | Path, ext: str, data: pd.DataFrame | Iterator[pd.DataFrame]
+    ) -> None:
         """
         Helper function to download data to a specified file path.
         """
+        import pandas as pd
+
+        data = AceDB._to_pandas(data)
+        if not isinstance(data, pd.DataFrame):
+            # streamed results are appended chunk by chunk
+            if ext != "csv":
+                raise ValueError("Streamed results can only be downloaded as csv.")
+            for i, chunk in enumerate(data):
+                chunk = AceDB._to_pandas(chunk)
+                chunk.to_csv(
+                    file_path, index=False, mode="w" if i == 0 else "a", header=i == 0
+                )
+            print(f"Data downloaded to {file_path}")
+            return
+
         writer = getattr(data, f"to_{ext}", None)
         if writer is None:
             raise ValueError(f"Unsupported file type: {ext}")
@@ -561,13 +1439,27 @@ class AceDB:
         if ext in ("csv", "xls", "xlsx", "html"):
             kwargs["index"] = False
         elif ext == "parquet":
-            kwargs["compression"] = "gzip"
+            kwargs["compression"] = "zstd"
         elif ext == "json":
             kwargs["orient"] = "records"
 
         writer(file_path, **kwargs)
         print(f"Data downloaded to {file_path}")
 
+    @staticmethod
+    def _to_pandas(data):
+        """
+        Convert Polars and Arrow results to pandas for the file writers.
+        """
+        import polars as pl
+        import pyarrow as pa
+
+        if isinstance(data, pl.LazyFrame):
+            data = data.collect()
+        if isinstance(data, (pl.DataFrame, pa.Table)):
+            data = data.to_pandas()
+        return data
+
     @staticmethod
     def _ask_yn(question: str) -> bool:
         """
@@ -588,21 +1480,19 @@ class AceDB:
         source_ranges: List[Tuple[datetime, datetime]],
     ) -> List[Tuple[str, str]]:
         """
-        Merge the given ranges with the requested range.
+        Merge overlapping and adjacent ranges.
         """
         if not source_ranges:
             return []
 
-        # Sort by start date
-        source_ranges.sort(key=lambda x: x[0])
+        source_ranges = sorted(source_ranges, key=lambda x: x[0])
         merged = [source_ranges[0]]
 
         for current_start, current_end in source_ranges[1:]:
             last_start, last_end = merged[-1]
 
-            # Only merge if last_end == current_start
-            if last_end == current_start:
-                merged[-1] = (last_start, current_end)
+            if current_start <= last_end:
+                merged[-1] = (last_start, max(last_end, current_end))
             else:
                 merged.append((current_start, current_end))
 
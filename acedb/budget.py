@@ -0,0 +1,49 @@
+import json
+import logging
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from .cache import locked_file, read_json, write_json
+
+LEDGER_PATH = Path.home() / ".acedb" / "spend.json"
+
+logger = logging.getLogger("acedb")
+
+
+def log_event(event: str, **fields) -> None:
+    """
+    Log an event as one JSON object, e.g. {"event": "plan", "total_cost": 1.2, ...}.
+    """
+    record = {"time": datetime.now(timezone.utc).isoformat(), "event": event}
+    record.update(fields)
+    logger.info(json.dumps(record, default=str))
+
+
+class SpendLedger:
+    """
+    Databento spend per day, stored in ~/.acedb/spend.json.
+
+    Reservations check the daily budget and record the spend under a file lock,
+    so separate processes running at the same time share one budget.
+    """
+
+    def __init__(self, path: Path = LEDGER_PATH):
+        self._path = Path(path)
+
+    def spent_today(self) -> float:
+        with locked_file(self._path):
+            return read_json(self._path).get(date.today().isoformat(), 0.0)
+
+    def reserve(self, amount: float, daily_budget: float = None) -> bool:
+        """
+        Record amount as spent today, unless that would exceed daily_budget.
+        """
+        with locked_file(self._path):
+            ledger = read_json(self._path)
+            today = date.today().isoformat()
+            spent = ledger.get(today, 0.0)
+            if daily_budget is not None and spent + amount > daily_budget:
+                return False
+            ledger[today] = spent + amount
+            write_json(self._path, ledger)
+            return True
@@ -0,0 +1,105 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+METADATA_CACHE_PATH = Path.home() / ".acedb" / "metadata.json"
+
+
+@contextmanager
+def locked_file(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on path's lock file, shared by all processes.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_json(path: Path) -> dict:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r") as json_file:
+        return json.load(json_file)
+
+
+def write_json(path: Path, data: dict) -> None:
+    """
+    Write to a temporary file and swap it in, so readers never see a partial file.
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_path, path)
+
+
+class MetadataCache:
+    """
+    On-disk cache of metadata API answers in ~/.acedb/metadata.json, shared by all
+    processes. Entries expire after ttl and can be cleared with clear().
+    """
+
+    def __init__(
+        self, path: Path = METADATA_CACHE_PATH, ttl: timedelta = timedelta(hours=24)
+    ):
+        self._path = Path(path)
+        self._ttl = ttl.total_seconds()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Get the cached value of key, calling fetch and storing its result if the
+        key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                with locked_file(self._path):
+                    entry = read_json(self._path).get(key)
+                if entry is not None and not self._expired(entry):
+                    self._entries[key] = entry
+
+        if entry is None or self._expired(entry):
+            entry = {"value": fetch(), "fetched_at": time.time()}
+            with self._lock:
+                self._entries[key] = entry
+                with locked_file(self._path):
+                    entries = read_json(self._path)
+                    entries[key] = entry
+                    write_json(self._path, entries)
+
+        # callers may modify the value, e.g. the field lists
+        return copy.deepcopy(entry["value"])
+
+    def clear(self) -> None:
+        """
+        Remove all entries, so the next lookups fetch fresh metadata.
+        """
+        with self._lock:
+            self._entries.clear()
+            with locked_file(self._path):
+                write_json(self._path, {})
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] > self._ttl
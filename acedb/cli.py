@@ -2,11 +2,18 @@ import click
 from pathlib import Path
 from getpass import getpass
 import json
-import psycopg2
 import os
 
 CONFIG_PATH = Path.home() / ".acedb" / "config.json"
 
+# set-budget options and the config keys they set
+BUDGET_OPTIONS = {
+    "per-call": "max_cost_per_call",
+    "per-day": "max_cost_per_day",
+    "auto-approve-below": "auto_approve_below",
+    "interactive": "interactive",
+}
+
 
 @click.group()
 def cli():
@@ -31,6 +38,8 @@ def login():
         "password": password,
     }
 
+    import psycopg2
+
     try:
         # Test the connection
         conn = psycopg2.connect(
@@ -90,6 +99,8 @@ def check_connection():
         click.echo("Error: No configuration found. Please login first.")
         return
 
+    import psycopg2
+
     with open(CONFIG_PATH, "r") as config_file:
         config = json.load(config_file)
 
@@ -257,5 +268,169 @@ def fred_logout():
         click.echo("Error: No configuration found.")
 
 
+@cli.command()
+@click.option("--dataset", default=None, help="Only migrate tables of this dataset.")
+@click.option(
+    "--fixed-prices",
+    is_flag=True,
+    help="Store prices as raw int64 fixed-point values instead of floats.",
+)
+@click.option(
+    "--batch-pages", default=10_000, show_default=True, help="Heap pages per batch."
+)
+def migrate_types(dataset, fixed_prices, batch_pages):
+    """Rewrite NUMERIC columns of existing tables to native types."""
+    from .acedb import AceDB
+
+    AceDB().migrate_types(
+        dataset=dataset, fixed_prices=fixed_prices, batch_pages=batch_pages
+    )
+    click.echo("Success: Column types migrated.")
+
+
+@cli.command()
+def migrate_fred():
+    """Convert FRED tables in the old wide layout to long format."""
+    from .acedb import AceDB
+
+    AceDB().migrate_fred()
+    click.echo("Success: FRED tables migrated.")
+
+
+@cli.command()
+@click.option("--per-call", type=float, default=None, help="Maximum spend per call.")
+@click.option("--per-day", type=float, default=None, help="Maximum spend per day.")
+@click.option(
+    "--auto-approve-below",
+    type=float,
+    default=None,
+    help="Approve plans below this cost without prompting.",
+)
+@click.option(
+    "--interactive/--non-interactive",
+    default=None,
+    help="Whether to prompt for cost approval.",
+)
+@click.option(
+    "--clear",
+    multiple=True,
+    type=click.Choice(list(BUDGET_OPTIONS)),
+    help="Remove a setting (repeatable).",
+)
+def set_budget(per_call, per_day, auto_approve_below, interactive, clear):
+    """Set the Databento spend budgets used to approve downloads."""
+    if not CONFIG_PATH.exists():
+        click.echo("Error: No configuration found. Please login first.")
+        return
+
+    with open(CONFIG_PATH, "r") as config_file:
+        config = json.load(config_file)
+
+    # only the given options change, the others keep their configured values
+    for option in clear:
+        config.pop(BUDGET_OPTIONS[option], None)
+    values = {
+        "per-call": per_call,
+        "per-day": per_day,
+        "auto-approve-below": auto_approve_below,
+        "interactive": interactive,
+    }
+    for option, value in values.items():
+        if value is not None:
+            config[BUDGET_OPTIONS[option]] = value
+
+    with open(CONFIG_PATH, "w") as config_file:
+        json.dump(config, config_file)
+
+    click.echo("Success: Budget configured.")
+
+
+@cli.command()
+@click.option("--dataset", default=None, help="Only compact ranges of this dataset.")
+@click.option("--schema", default=None, help="Only compact ranges of this schema.")
+def compact_ranges(dataset, schema):
+    """Merge overlapping and adjacent stored ranges."""
+    from .acedb import AceDB
+
+    AceDB().compact_ranges(dataset=dataset, schema=schema)
+    click.echo("Success: Ranges compacted.")
+
+
+@cli.command()
+@click.option("--dataset", required=True, help="Dataset to export.")
+@click.option(
+    "--path", required=True, help="Directory to write the Parquet datasets to."
+)
+@click.option(
+    "--schema", "schemas", multiple=True, help="Schema to export (repeatable)."
+)
+@click.option(
+    "--symbol", "symbols", multiple=True, help="Symbol to export (repeatable)."
+)
+@click.option("--start", default=None, help="Start date/time.")
+@click.option("--end", default=None, help="End date/time.")
+@click.option(
+    "--partition-by",
+    default=None,
+    help='Comma separated partition columns, e.g. "symbol,date", or "" for none.',
+)
+@click.option(
+    "--compression",
+    type=click.Choice(["zstd", "lz4", "snappy", "gzip", "none"]),
+    default="zstd",
+    show_default=True,
+)
+@click.option("--compression-level", type=int, default=None, help="Compression level.")
+@click.option(
+    "--row-group-size", default=1_000_000, show_default=True, help="Rows per row group."
+)
+@click.option(
+    "--max-rows-per-file", type=int, default=None, help="Rows per file in a partition."
+)
+def export(
+    dataset,
+    path,
+    schemas,
+    symbols,
+    start,
+    end,
+    partition_by,
+    compression,
+    compression_level,
+    row_group_size,
+    max_rows_per_file,
+):
+    """Export stored data to a partitioned Parquet dataset."""
+    from .acedb import AceDB
+
+    AceDB().export(
+        dataset=dataset,
+        path=path,
+        schemas=list(schemas) or None,
+        symbols=list(symbols) or None,
+        start=start,
+        end=end,
+        partition_by=(
+            [col for col in partition_by.split(",") if col]
+            if partition_by is not None
+            else None
+        ),
+        compression=compression,
+        compression_level=compression_level,
+        row_group_size=row_group_size,
+        max_rows_per_file=max_rows_per_file,
+    )
+    click.echo("Success: Data exported.")
+
+
+@cli.command()
+def refresh_metadata():
+    """Clear the cached Databento metadata."""
+    from .cache import MetadataCache
+
+    MetadataCache().clear()
+    click.echo("Success: Metadata cache cleared.")
+
+
 if __name__ == "__main__":
     cli()
@@ -12,6 +12,23 @@ class Config:
     db_name: str = None
     username: str = None
     password: str = None
+    min_connections: int = 1
+    max_connections: int = 8
+    partition_interval: str = "month"
+    download_workers: int = 4
+    writer_workers: int = 2
+    pipeline_queue_size: int = 8
+    fetch_retries: int = 3
+    symbols_per_request: int = 500
+    ingest_chunk_rows: int = 1_000_000
+    download_dir: str = None
+    metadata_ttl_hours: float = 24
+    fred_workers: int = 8
+    fred_requests_per_minute: int = 120
+    interactive: bool = None
+    max_cost_per_call: float = None
+    max_cost_per_day: float = None
+    auto_approve_below: float = None
 
     def __init__(self):
         if not CONFIG_PATH.exists():
@@ -31,3 +48,40 @@ class Config:
         self.port = raw_config.get("port")
         self.db_name = raw_config.get("db_name")
         self.username = raw_config.get("username")
+        self.min_connections = raw_config.get("min_connections", self.min_connections)
+        self.max_connections = raw_config.get("max_connections", self.max_connections)
+        self.partition_interval = raw_config.get(
+            "partition_interval", self.partition_interval
+        )
+        self.download_workers = raw_config.get(
+            "download_workers", self.download_workers
+        )
+        self.writer_workers = raw_config.get("writer_workers", self.writer_workers)
+        self.pipeline_queue_size = raw_config.get(
+            "pipeline_queue_size", self.pipeline_queue_size
+        )
+        self.fetch_retries = raw_config.get("fetch_retries", self.fetch_retries)
+        self.symbols_per_request = raw_config.get(
+            "symbols_per_request", self.symbols_per_request
+        )
+        self.ingest_chunk_rows = raw_config.get(
+            "ingest_chunk_rows", self.ingest_chunk_rows
+        )
+        self.download_dir = raw_config.get("download_dir", self.download_dir)
+        self.metadata_ttl_hours = raw_config.get(
+            "metadata_ttl_hours", self.metadata_ttl_hours
+        )
+        self.fred_workers = raw_config.get("fred_workers", self.fred_workers)
+        self.fred_requests_per_minute = raw_config.get(
+            "fred_requests_per_minute", self.fred_requests_per_minute
+        )
+        self.interactive = raw_config.get("interactive", self.interactive)
+        self.max_cost_per_call = raw_config.get(
+            "max_cost_per_call", self.max_cost_per_call
+        )
+        self.max_cost_per_day = raw_config.get(
+            "max_cost_per_day", self.max_cost_per_day
+        )
+        self.auto_approve_below = raw_config.get(
+            "auto_approve_below", self.auto_approve_below
+        )
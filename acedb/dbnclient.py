@@ -1,108 +1,198 @@
 import databento as dbn
+from databento.common.constants import SCHEMA_STRUCT_MAP
 import os
-from typing import List, Optional, Dict, Any, Tuple
-from datetime import datetime, timedelta
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple, Iterator
+from datetime import date, datetime, timedelta
 import pandas as pd
 
+from .cache import MetadataCache
+
+# columns that identify a record of the aggregated schemas, used to skip rows
+# that are already stored. Records of the other schemas, e.g. trades and mbp, are
+# only told apart by fields such as flags and the book levels, more than an index
+# can hold, so their stored windows are replaced instead.
+NATURAL_KEYS = {
+    "ohlcv": ["symbol", "ts_event", "instrument_id"],
+    "bbo": ["symbol", "ts_event", "ts_recv", "instrument_id"],
+    "cbbo": ["symbol", "ts_event", "ts_recv", "instrument_id"],
+}
+
 
 class DBNClient:
 
-    def __init__(self):
+    def __init__(self, metadata_ttl: timedelta = timedelta(hours=24)):
         if "DATABENTO_API_KEY" not in os.environ:
             raise ValueError("Missing Databento API key")
 
         self._client = dbn.Historical()
+        self._metadata = MetadataCache(ttl=metadata_ttl)
+        self._cost_cache = {}
+        self._cost_lock = threading.Lock()
         print("Databento client initialized.")
 
-    def get_data(
+    def download(
         self,
         dataset: str,
         schema: str,
-        symbol: str,
+        symbol: str | List[str],
         ranges: List[Tuple[datetime, datetime]],
         stype_in: str = "raw_symbol",
         stype_out: str = "instrument_id",
-    ) -> Tuple[Dict[str, Any], list]:
+        directory: str | Path = None,
+    ) -> List[Path]:
         """
-        Get data from Databento for a given dataset and schema.
+        Stream data from Databento into DBN files on disk, one per range, without
+        loading it into memory. Files of a failed download are removed.
         """
+        directory = Path(directory or tempfile.gettempdir())
+        directory.mkdir(parents=True, exist_ok=True)
 
-        data = []
-        for start, end in ranges:
-            data_fragment = self._client.timeseries.get_range(
-                dataset=dataset,
-                schema=schema,
-                symbols=symbol,
-                start=start,
-                end=end,
-                stype_in=stype_in,
-                stype_out=stype_out,
-            ).to_df()
-            data_fragment.reset_index(inplace=True)
-            data.append(data_fragment)
+        paths = []
+        try:
+            for start, end in ranges:
+                path = directory / f"acedb_{uuid.uuid4().hex}.dbn.zst"
+                paths.append(path)
+                self._client.timeseries.get_range(
+                    dataset=dataset,
+                    schema=schema,
+                    symbols=symbol,
+                    start=start,
+                    end=end,
+                    stype_in=stype_in,
+                    stype_out=stype_out,
+                    path=path,
+                )
+        except Exception:
+            self.remove_files(paths)
+            raise
+        return paths
 
-        data = pd.concat(data)
+    @staticmethod
+    def iter_chunks(
+        paths: List[Path], price_type: str = "float", chunk_rows: int = 1_000_000
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read downloaded DBN files as DataFrames of at most chunk_rows records, so
+        only one chunk is decoded at a time.
+        """
+        for path in paths:
+            store = dbn.DBNStore.from_file(path)
+            for chunk in store.to_df(price_type=price_type, count=chunk_rows):
+                yield chunk.reset_index()
 
-        return data
+    @staticmethod
+    def remove_files(paths: List[Path]) -> None:
+        """
+        Remove downloaded DBN files.
+        """
+        for path in paths:
+            Path(path).unlink(missing_ok=True)
 
-    def _get_col_dict(self, schema: str) -> list:
+    def _get_col_dict(self, schema: str, fixed_prices: bool = False) -> list:
         """
         Get the column dictionary for a given dataset and schema.
+
+        Prices are stored as floats, or as the raw int64 fixed-point values
+        (1 unit = 1e-9) when fixed_prices is set.
         """
 
-        cols = self._client.metadata.list_fields(schema, "csv")
+        cols = self._metadata.get(
+            f"fields/{schema}/csv",
+            lambda: self._client.metadata.list_fields(schema, "csv"),
+        )
+        record = SCHEMA_STRUCT_MAP[dbn.Schema(schema)]
 
         for col in cols:
-            if col["name"] in ("ts_event", "ts_recv"):
+            if (
+                col["name"] in ("ts_event", "ts_recv")
+                or col["name"] in record._timestamp_fields
+            ):
                 col["type"] = "timestamp"
+            elif col["name"] in record._price_fields:
+                col["type"] = "int64_t" if fixed_prices else "float"
 
         # symbol always appears at the end
         cols.append({"name": "symbol", "type": "string"})
 
         return cols
 
-    def _resolve_symbology(
+    @staticmethod
+    def _get_natural_key(schema: str) -> List[str] | None:
+        """
+        Get the columns that identify a record of a schema, e.g. ohlcv-1m -> ohlcv,
+        or None for schemas without one.
+        """
+        return NATURAL_KEYS.get(schema, NATURAL_KEYS.get(schema.split("-")[0]))
+
+    @staticmethod
+    def _is_schema(schema: str) -> bool:
+        """
+        Check whether a name is a Databento schema with a known record type.
+        """
+        return schema in {str(known) for known in SCHEMA_STRUCT_MAP}
+
+    @staticmethod
+    def _get_price_fields(schema: str) -> List[str]:
+        """
+        Get the price fields of a schema's records.
+        """
+        return list(SCHEMA_STRUCT_MAP[dbn.Schema(schema)]._price_fields)
+
+    def _resolve_parent(
         self,
         dataset: str,
-        symbols: List[str] | str,
+        parent: str,
         stype_in: str,
         stype_out: str,
         start_date: datetime,
         end_date: datetime,
-    ) -> List[str]:
-
-        symbols = symbols if isinstance(symbols, list) else [symbols]
-
-        if any(item.endswith((".OPT", ".FUT")) for item in symbols):
-
-            symbols = [
-                symbol for symbol in symbols if symbol.endswith((".FUT", ".OPT"))
-            ]
+    ) -> List[Tuple[str, date, date]]:
+        """
+        Resolve a parent symbol (e.g. ES.FUT) into its child symbols, as
+        (symbol, valid_from, valid_to) over the given window.
+        """
+        max_span = timedelta(days=365 * 3)
+        window_from, window_to = start_date.date(), end_date.date()
+        intervals = {}
 
-            max_span = timedelta(days=365 * 3)
-            result_symbols = []
+        current_start = start_date
+        while current_start < end_date:
+            current_end = min(current_start + max_span, end_date)
 
-            current_start = start_date
-            while current_start < end_date:
-                current_end = min(current_start + max_span, end_date)
+            symbology = self._client.symbology.resolve(
+                dataset=dataset,
+                symbols=[parent],
+                stype_in=stype_in,
+                stype_out=stype_out,
+                start_date=current_start,
+                end_date=current_end,
+            )
 
-                symbology = self._client.symbology.resolve(
-                    dataset=dataset,
-                    symbols=symbols,
-                    stype_in=stype_in,
-                    stype_out=stype_out,
-                    start_date=current_start,
-                    end_date=current_end,
-                )
+            for symbol, mappings in symbology["result"].items():
+                for mapping in mappings:
+                    valid_from = date.fromisoformat(mapping["d0"])
+                    valid_to = date.fromisoformat(mapping["d1"])
+                    if symbol in intervals:
+                        valid_from = min(valid_from, intervals[symbol][0])
+                        valid_to = max(valid_to, intervals[symbol][1])
+                    intervals[symbol] = (valid_from, valid_to)
+            for symbol in symbology["partial"]:
+                intervals.setdefault(symbol, (window_from, window_to))
 
-                result_symbols.extend(list(symbology["result"].keys()))
-                result_symbols.extend(symbology["partial"])
+            current_start = current_end
 
-                current_start = current_end
+        return [(symbol, start, end) for symbol, (start, end) in intervals.items()]
 
-            return list(set(result_symbols))  # remove duplicates
-        else:
-            return symbols
+    def refresh_metadata(self) -> None:
+        """
+        Clear the cached dataset, schema and field lists.
+        """
+        self._metadata.clear()
 
     ### validation functions ###
 
@@ -110,7 +200,10 @@ class DBNClient:
         """
         Validate if the dataset exists in Databento.
         """
-        if dataset not in self._client.metadata.list_datasets():
+        datasets = self._metadata.get(
+            "datasets", lambda: self._client.metadata.list_datasets()
+        )
+        if dataset not in datasets:
             print(f"Dataset {dataset} not found in Databento.")
             return False
         return True
@@ -119,32 +212,58 @@ class DBNClient:
         """
         Validate if the schema exists in Databento.
         """
-        if schema not in self._client.metadata.list_schemas(dataset):
+        schemas = self._metadata.get(
+            f"schemas/{dataset}", lambda: self._client.metadata.list_schemas(dataset)
+        )
+        if schema not in schemas:
             print(f"Schema {schema} not found in Databento.")
             return False
         return True
 
-    def _get_cost(
+    def _get_costs(
         self,
         dataset: str,
-        schema: str,
-        symbol: str,
-        ranges: List[Tuple[datetime, datetime]],
+        requests: Dict[Tuple[str, datetime, datetime], List[str]],
         stype_in: str,
-    ) -> float:
+        batch_size: int = 2000,
+        workers: int = 8,
+    ) -> Dict[Tuple[str, datetime, datetime], float]:
         """
-        Get the cost of a given dataset and schema.
+        Get the cost of many requests, keyed by (schema, start, end) with the symbols
+        to request over that range.
+
+        The symbols of a key are priced together in batches of up to batch_size, the
+        batches are queried concurrently, and costs are cached per batch so that
+        repeated plans do not query again.
         """
-        total_cost = 0.0
-        for start, end in ranges:
+        batches = [
+            (key, tuple(symbols[i : i + batch_size]))
+            for key, symbols in requests.items()
+            for i in range(0, len(symbols), batch_size)
+        ]
+
+        def get_cost(batch) -> float:
+            (schema, start, end), symbols = batch
+            cache_key = (dataset, schema, stype_in, start, end, symbols)
+            with self._cost_lock:
+                if cache_key in self._cost_cache:
+                    return self._cost_cache[cache_key]
             cost = self._client.metadata.get_cost(
                 dataset=dataset,
                 schema=schema,
-                symbols=symbol,
+                symbols=list(symbols),
                 start=start,
                 end=end,
                 stype_in=stype_in,
             )
-            total_cost += cost
+            with self._cost_lock:
+                self._cost_cache[cache_key] = cost
+            return cost
 
-        return total_cost
+        costs = dict.fromkeys(requests, 0.0)
+        if not batches:
+            return costs
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            for (key, _), cost in zip(batches, executor.map(get_cost, batches)):
+                costs[key] += cost
+        return costs
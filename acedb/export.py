@@ -0,0 +1,157 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import quote
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_COMPRESSIONS = ("zstd", "lz4", "snappy", "gzip", "none")
+
+
+class ParquetExporter:
+    """
+    Write chunks of data to a Hive-partitioned Parquet dataset, e.g.
+    path/symbol=ESH4/date=2024-01-02/part-0.parquet.
+
+    Chunks must arrive ordered by the partition columns, so that only one file is
+    open at a time and at most row_group_size rows are held back. Files are named
+    part-0, part-1, ... within each partition, starting a new one every
+    max_rows_per_file rows, so the same data always gives the same files. A
+    partition that is written replaces an earlier export of it, and its files only
+    appear once they are complete. A "date" partition column that the data does
+    not have is taken from ts_event.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        partition_by: List[str] = None,
+        compression: str = "zstd",
+        compression_level: int = None,
+        row_group_size: int = 1_000_000,
+        max_rows_per_file: int = None,
+    ):
+        if compression not in PARQUET_COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression {compression}, expected one of {PARQUET_COMPRESSIONS}."
+            )
+        self._path = Path(path)
+        self._partition_by = list(partition_by or [])
+        self._compression = compression
+        self._compression_level = compression_level
+        self._row_group_size = max(row_group_size, 1)
+        self._max_rows_per_file = max_rows_per_file
+
+        self._key = None
+        self._finished = set()
+        self._buffer = []
+        self._buffered = 0
+        self._writer = None
+        self._schema = None
+        self._file_number = 0
+        self._file_rows = 0
+        self._files = []
+
+    def write(self, chunk: pl.DataFrame) -> None:
+        if chunk.is_empty():
+            return
+        if "date" in self._partition_by and "date" not in chunk.columns:
+            chunk = chunk.with_columns(date=pl.col("ts_event").dt.date())
+        if not self._partition_by:
+            self._append((), chunk)
+            return
+        parts = chunk.partition_by(
+            self._partition_by, maintain_order=True, include_key=False, as_dict=True
+        )
+        for key, part in parts.items():
+            self._append(key, part)
+
+    def close(self) -> List[Path]:
+        """
+        Write the remaining rows and return the paths of the written files.
+        """
+        self._finish_partition()
+        return self._files
+
+    def _append(self, key: Tuple, data: pl.DataFrame) -> None:
+        if key != self._key:
+            self._finish_partition()
+            if key in self._finished:
+                raise ValueError(
+                    f"Data is not ordered by the partition columns {self._partition_by}."
+                )
+            self._start_partition(key)
+
+        self._buffer.append(data)
+        self._buffered += data.height
+        while self._buffered >= self._row_group_size:
+            self._write_row_group(self._row_group_size)
+
+    def _start_partition(self, key: Tuple) -> None:
+        self._key = key
+        directory = self._partition_dir(key)
+        directory.mkdir(parents=True, exist_ok=True)
+        for old_file in directory.glob("part-*.parquet"):
+            old_file.unlink()
+        self._file_number = 0
+
+    def _finish_partition(self) -> None:
+        if self._key is None:
+            return
+        while self._buffered:
+            self._write_row_group(min(self._buffered, self._row_group_size))
+        self._close_file()
+        self._finished.add(self._key)
+        self._key = None
+
+    def _write_row_group(self, rows: int) -> None:
+        if self._max_rows_per_file:
+            if self._file_rows >= self._max_rows_per_file:
+                self._close_file()
+            rows = min(rows, self._max_rows_per_file - self._file_rows)
+
+        data = pl.concat(self._buffer, how="vertical_relaxed")
+        table = data.head(rows).to_arrow()
+        rest = data.slice(rows)
+        self._buffer = [rest] if rest.height else []
+        self._buffered = rest.height
+
+        if self._writer is None:
+            self._open_file(table.schema)
+        self._writer.write_table(table.cast(self._schema), row_group_size=rows)
+        self._file_rows += rows
+
+    def _open_file(self, schema: pa.Schema) -> None:
+        if self._schema is None:
+            self._schema = schema
+        temp_path = self._file_path().with_name(f".{self._file_path().name}.tmp")
+        self._writer = pq.ParquetWriter(
+            temp_path,
+            self._schema,
+            compression=self._compression,
+            compression_level=self._compression_level,
+        )
+
+    def _close_file(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        file_path = self._file_path()
+        # readers of the dataset skip files starting with a dot, so a file only
+        # becomes visible once it is complete
+        os.replace(file_path.with_name(f".{file_path.name}.tmp"), file_path)
+        self._files.append(file_path)
+        self._file_number += 1
+        self._file_rows = 0
+
+    def _file_path(self) -> Path:
+        return self._partition_dir(self._key) / f"part-{self._file_number}.parquet"
+
+    def _partition_dir(self, key: Tuple) -> Path:
+        directory = self._path
+        for column, value in zip(self._partition_by, key):
+            directory /= f"{column}={quote(str(value), safe='')}"
+        return directory
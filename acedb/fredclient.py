@@ -1,77 +1,154 @@
 from fredapi import Fred
 import os
+import time
 import pandas as pd
+from datetime import date
+from typing import Any, Callable, Tuple
+
+from .ratelimit import TokenBucket
+
+# one row per observation date and release
+NATURAL_KEY = ["date", "realtime_start"]
+# FRED allows 120 requests per minute per API key
+REQUESTS_PER_MINUTE = 120
+# fredapi raises ValueError with FRED's message for HTTP errors; these are retried
+TRANSIENT_ERRORS = ("Too Many Requests", "Rate Limit", "Internal Server Error")
 
 
 class FREDClient:
 
-    def __init__(self):
+    def __init__(
+        self,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        retries: int = 3,
+        backoff: float = 2.0,
+    ):
+        """
+        Parameters:
+            requests_per_minute (int, optional): Request rate shared by all threads
+                using the client. Defaults to FRED's limit of 120.
+            retries (int, optional): Retries of requests that failed with a rate
+                limit, server or network error. Defaults to 3.
+            backoff (float, optional): Seconds before the first retry, doubled for
+                each further retry. Defaults to 2.0.
+        """
         self._client = Fred(api_key=os.environ["FRED_API_KEY"])
+        self._limiter = TokenBucket(rate=requests_per_minute / 60)
+        self._retries = retries
+        self._backoff = backoff
         print("FRED client initialized.")
 
-    def get_data(self, series_id: str):
-        """
-        Get data from FRED for a given series ID.
+    def get_data(
+        self, series_id: str, since: date = None, vintages: bool = None
+    ) -> Tuple[pd.DataFrame, bool]:
         """
-        try:
-            series_data = self._get_vintage(series_id)
-            series_data = self._process_vintage(series_data)
-            series_data = series_data.reset_index()
+        Get data from FRED for a given series ID, as one (realtime_start, date,
+        value) row per observation and release, and whether the series has
+        vintages. Series without vintages get realtime_start = date.
 
-            return series_data, self._get_column_dict(series_data)
-        except:
-            series_data = self._get_series(series_id)
-            series_data.index = pd.to_datetime(series_data.index, format="%Y-%m-%d")
-            series_data.index.name = "ts_event"
-            series_data = series_data.reset_index()
-            return series_data, self._get_column_dict(series_data)
-
-    def _validate_symbol(self, dataset: str) -> bool:
-        """
-        Validate if the dataset exists in FRED.
+        With since, only releases from that date on are fetched, or for series
+        without vintages observations from that date on. FRED reports values that
+        were already valid on since with realtime_start = since. vintages skips
+        the attempt to get vintages when it is known to be False.
         """
-        if self._get_series_info(dataset) is None:
-            return False
-        return True
+        start = since.isoformat() if since else None
+        if vintages is not False:
+            try:
+                series_data = self._get_vintage(series_id, realtime_start=start)
+                return self._process_vintage(series_data), True
+            except Exception as error:
+                if vintages or self._is_transient(error):
+                    raise
+
+        series_data = self._get_series(series_id, observation_start=start)
+        dates = pd.to_datetime(series_data.index, format="%Y-%m-%d")
+        data = pd.DataFrame(
+            {
+                "realtime_start": dates,
+                "date": dates,
+                "value": series_data.to_numpy(dtype=float),
+            }
+        )
+        return data.dropna(subset=["value"]), False
 
     def _get_series_info(self, series_id: str) -> pd.Series:
         """
         Get information about a series from FRED.
         """
-        series_info = self._client.get_series_info(series_id)
+        series_info = self._request(self._client.get_series_info, series_id)
         return series_info
 
-    def _get_series(self, series_id: str) -> pd.Series:
+    def _get_series(self, series_id: str, observation_start: str = None) -> pd.Series:
         """
         Get series data from FRED.
         """
-        series_data = self._client.get_series(series_id)
+        series_data = self._request(
+            self._client.get_series, series_id, observation_start=observation_start
+        )
         return series_data
 
-    def _get_vintage(self, series_id: str) -> pd.Series:
+    def _get_vintage(self, series_id: str, realtime_start: str = None) -> pd.DataFrame:
         """
         Get vintage data from FRED.
         """
-        series_data = self._client.get_series_all_releases(series_id)
+        series_data = self._request(
+            self._client.get_series_all_releases,
+            series_id,
+            realtime_start=realtime_start,
+        )
         return series_data
 
+    def _request(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Call a fredapi function within the rate limit, retrying transient errors
+        with exponential backoff.
+        """
+        for attempt in range(self._retries + 1):
+            self._limiter.acquire()
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                if attempt == self._retries or not self._is_transient(error):
+                    raise
+                delay = self._backoff * 2**attempt
+                print(f"FRED request failed ({error}), retrying in {delay:g}s.")
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """
+        Check if a request error is worth retrying. FRED answers bad requests,
+        e.g. unknown series, with ValueError and network errors surface as OSError
+        or unparsable responses.
+        """
+        if isinstance(error, ValueError):
+            return any(message in str(error) for message in TRANSIENT_ERRORS)
+        return True
+
     def _process_vintage(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Process vintage data from FRED.
         """
-        df["value"] = df["value"].astype(float)
+        df = df[["realtime_start", "date", "value"]].copy()
+        df["realtime_start"] = pd.to_datetime(df["realtime_start"], format="%Y-%m-%d")
         df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
-        pivot_df = df.pivot(index="realtime_start", columns="date", values="value")
-        pivot_df.columns = pivot_df.columns.strftime("%Y-%m-%d")
-
-        pivot_df = pivot_df.ffill(axis=0)
-        pivot_df.index = pd.to_datetime(pivot_df.index, format="%Y-%m-%d")
-        pivot_df.index.name = "ts_event"
-        return pivot_df
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
+        return df.dropna(subset=["value"]).reset_index(drop=True)
 
-    def _get_column_dict(self, data: pd.DataFrame) -> list:
-        col_dict = [
-            {"name": str(col), "type": str(dtype.name)}
-            for col, dtype in data.dtypes.items()
-        ]
-        return col_dict
+    @staticmethod
+    def _drop_unchanged(data: pd.DataFrame, stored: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop fetched rows that repeat the previous value of their date, either a
+        stored value or an earlier fetched row. Used on incremental fetches, where
+        values that did not change since the last sync come back as new rows.
+        """
+        combined = pd.concat(
+            [stored[data.columns].assign(fetched=False), data.assign(fetched=True)],
+            ignore_index=True,
+        )
+        combined = combined.sort_values(
+            ["date", "realtime_start", "fetched"], kind="stable"
+        )
+        previous = combined.groupby("date")["value"].shift()
+        keep = combined["fetched"] & (combined["value"] != previous)
+        return combined.loc[keep, data.columns].reset_index(drop=True)
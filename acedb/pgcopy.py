@@ -0,0 +1,268 @@
+import io
+from typing import Dict, Iterable, Iterator, Tuple
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute
+
+PG_TO_POLARS = {
+    "smallint": pl.Int16,
+    "integer": pl.Int32,
+    "bigint": pl.Int64,
+    "real": pl.Float32,
+    "double precision": pl.Float64,
+    "numeric": pl.Float64,
+    "boolean": pl.Boolean,
+    "date": pl.Date,
+    "timestamp without time zone": pl.Datetime("us"),
+    "timestamp with time zone": pl.Datetime("us", "UTC"),
+    "character varying": pl.Utf8,
+    "character": pl.Utf8,
+    "text": pl.Utf8,
+}
+
+PG_TIMESTAMP_FORMATS = {
+    "timestamp without time zone": "%Y-%m-%d %H:%M:%S%.f",
+    "timestamp with time zone": "%Y-%m-%d %H:%M:%S%.f%#z",
+}
+
+
+def base_type(pg_type: str) -> str:
+    """
+    Strip the modifiers from a Postgres type, e.g. VARCHAR(255) -> character varying.
+    """
+    return pg_type.split("(")[0].strip().lower()
+
+
+def read_csv(buffer: io.BytesIO, pg_types: Dict[str, str]) -> pl.DataFrame:
+    """
+    Decode the output of COPY ... TO STDOUT WITH (FORMAT csv, HEADER true) into
+    native Polars columns, using the Postgres types of the selected columns.
+    """
+    buffer.seek(0)
+
+    overrides = {}
+    conversions = {}
+    for name, pg_type in pg_types.items():
+        pg_type = base_type(pg_type)
+        if pg_type in PG_TIMESTAMP_FORMATS:
+            # Postgres omits the fractional seconds when they are zero, so parse
+            # the text explicitly rather than relying on inference
+            overrides[name] = pl.Utf8
+            conversions[name] = pl.col(name).str.to_datetime(
+                PG_TIMESTAMP_FORMATS[pg_type], time_unit="us"
+            )
+        elif pg_type == "boolean":
+            overrides[name] = pl.Utf8
+            conversions[name] = pl.col(name) == "t"
+        else:
+            overrides[name] = PG_TO_POLARS.get(pg_type, pl.Utf8)
+
+    df = pl.read_csv(buffer, schema_overrides=overrides, infer_schema_length=0)
+    conversions = [expr for name, expr in conversions.items() if name in df.columns]
+    if conversions:
+        df = df.with_columns(conversions)
+    return df
+
+
+##### Binary COPY FROM #####
+
+PGCOPY_HEADER = (
+    b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+)
+PGCOPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+
+# microseconds and days between the unix epoch and the Postgres epoch (2000-01-01)
+PG_EPOCH_US = 946_684_800_000_000
+PG_EPOCH_DAYS = 10_957
+
+FIXED_WIDTH_TYPES = {
+    "smallint": ">i2",
+    "integer": ">i4",
+    "bigint": ">i8",
+    "real": ">f4",
+    "double precision": ">f8",
+    "boolean": "u1",
+    "date": ">i4",
+    "timestamp without time zone": ">i8",
+    "timestamp with time zone": ">i8",
+}
+TEXT_TYPES = ("character varying", "character", "text")
+
+
+def binary_supported(data: pl.DataFrame, pg_types: Dict[str, str]) -> bool:
+    """
+    Check whether every column of data can be written with binary COPY into
+    columns of the given Postgres types. NUMERIC has no cheap binary encoding,
+    so tables still using it are written as CSV.
+    """
+    for name, dtype in data.schema.items():
+        pg_type = base_type(pg_types[name])
+        if pg_type in TEXT_TYPES:
+            continue
+        if pg_type not in FIXED_WIDTH_TYPES:
+            return False
+        if pg_type in ("smallint", "integer", "bigint") and not (
+            dtype.is_integer() or dtype == pl.Boolean
+        ):
+            return False
+        if pg_type in ("real", "double precision") and not (
+            dtype.is_numeric() or dtype == pl.Boolean
+        ):
+            return False
+        if pg_type == "boolean" and dtype != pl.Boolean:
+            return False
+        if pg_type.startswith("timestamp") and not isinstance(dtype, pl.Datetime):
+            return False
+        if pg_type == "date" and not (
+            dtype == pl.Date or isinstance(dtype, pl.Datetime)
+        ):
+            return False
+    return True
+
+
+def binary_chunks(
+    data: pl.DataFrame, pg_types: Dict[str, str], chunk_rows: int
+) -> Iterator[bytes]:
+    """
+    Yield a binary COPY stream for data, encoding chunk_rows rows at a time.
+    """
+    yield PGCOPY_HEADER
+    for offset in range(0, data.height, chunk_rows):
+        yield _encode_binary_rows(data.slice(offset, chunk_rows), pg_types)
+    yield PGCOPY_TRAILER
+
+
+def csv_chunks(data: pl.DataFrame, chunk_rows: int) -> Iterator[bytes]:
+    """
+    Yield a headerless CSV COPY stream for data, chunk_rows rows at a time.
+    """
+    for offset in range(0, data.height, chunk_rows):
+        buffer = io.BytesIO()
+        data.slice(offset, chunk_rows).write_csv(buffer, include_header=False)
+        yield buffer.getvalue()
+
+
+def _encode_binary_rows(data: pl.DataFrame, pg_types: Dict[str, str]) -> bytes:
+    """
+    Encode rows in the Postgres binary COPY tuple format.
+
+    Each column is turned into big-endian payload bytes with numpy, and all
+    columns are then scattered into one row-major buffer, so no Python code
+    runs per row.
+    """
+    n_rows = data.height
+    fields = [
+        _encode_binary_column(data[name], base_type(pg_types[name]))
+        for name in data.columns
+    ]
+
+    # every row starts with the field count, then a 4 byte length and the payload per field
+    row_sizes = np.full(n_rows, 2, dtype=np.int64)
+    for lengths, _ in fields:
+        row_sizes += 4 + np.maximum(lengths, 0)
+    row_starts = np.zeros(n_rows, dtype=np.int64)
+    np.cumsum(row_sizes[:-1], out=row_starts[1:])
+
+    buffer = np.empty(int(row_sizes.sum()), dtype=np.uint8)
+    _scatter_fixed(
+        buffer, row_starts, np.full(n_rows, len(fields), dtype=">i2").view(np.uint8)
+    )
+
+    field_starts = row_starts + 2
+    for lengths, payload in fields:
+        _scatter_fixed(buffer, field_starts, lengths.astype(">i4").view(np.uint8))
+        payload_sizes = np.maximum(lengths, 0)
+        if len(payload):
+            source_starts = np.cumsum(payload_sizes) - payload_sizes
+            target = np.repeat(field_starts + 4 - source_starts, payload_sizes)
+            target += np.arange(len(payload), dtype=np.int64)
+            buffer[target] = payload
+        field_starts = field_starts + 4 + payload_sizes
+
+    return buffer.tobytes()
+
+
+def _scatter_fixed(buffer: np.ndarray, starts: np.ndarray, values: np.ndarray) -> None:
+    """
+    Write one fixed-width value per row at the given row offsets.
+    """
+    width = len(values) // max(len(starts), 1)
+    target = starts[:, None] + np.arange(width, dtype=np.int64)
+    buffer[target.ravel()] = values
+
+
+def _encode_binary_column(
+    series: pl.Series, pg_type: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode a column as (field lengths, concatenated payload bytes). Null values
+    get a length of -1 and no payload.
+    """
+    nulls = series.is_null().to_numpy()
+
+    if pg_type in TEXT_TYPES:
+        values = series.cast(pl.Utf8).fill_null("").to_arrow()
+        values = pa.compute.cast(values, pa.large_string())
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+        _, offsets, data = values.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[
+            values.offset : values.offset + len(values) + 1
+        ]
+        lengths = np.diff(offsets)
+        payload = (
+            np.frombuffer(data, dtype=np.uint8)[offsets[0] : offsets[-1]]
+            if data is not None
+            else np.empty(0, dtype=np.uint8)
+        )
+        lengths[nulls] = -1
+        return lengths, payload
+
+    if pg_type.startswith("timestamp"):
+        if pg_type == "timestamp without time zone" and series.dtype.time_zone:
+            # timestamp columns store the wall clock, as the CSV path did
+            series = series.dt.replace_time_zone(None)
+        values = series.dt.epoch("us").fill_null(0).to_numpy() - PG_EPOCH_US
+    elif pg_type == "date":
+        values = (
+            series.cast(pl.Date).to_physical().fill_null(0).to_numpy() - PG_EPOCH_DAYS
+        )
+    else:
+        values = series.fill_null(0).to_numpy()
+
+    dtype = np.dtype(FIXED_WIDTH_TYPES[pg_type])
+    width = dtype.itemsize
+    payload = values[~nulls].astype(dtype).view(np.uint8)
+    lengths = np.where(nulls, -1, width).astype(np.int64)
+    return lengths, payload
+
+
+class IteratorReader(io.RawIOBase):
+    """
+    File-like reader over an iterator of byte chunks, so that COPY FROM only
+    ever holds one encoded chunk in memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._current = memoryview(b"")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while self._position >= len(self._current):
+            try:
+                self._current = memoryview(next(self._chunks))
+            except StopIteration:
+                return b""
+            self._position = 0
+
+        if size is None or size < 0:
+            size = len(self._current) - self._position
+        data = self._current[self._position : self._position + size]
+        self._position += len(data)
+        return bytes(data)
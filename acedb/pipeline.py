@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Tuple
+
+
+class FetchTask(NamedTuple):
+    """
+    One Databento request: a schema and symbols over a list of missing ranges.
+    """
+
+    schema: str
+    symbols: List[str]
+    ranges: List[Tuple[datetime, datetime]]
+
+    def __str__(self) -> str:
+        symbols = ", ".join(self.symbols[:3])
+        if len(self.symbols) > 3:
+            symbols += f" and {len(self.symbols) - 3} more"
+        return f"{self.schema} {symbols}"
+
+
+class IngestPipeline:
+    """
+    Download and insert tasks concurrently.
+
+    A pool of downloader threads runs fetch(task) and puts the results on a bounded
+    queue, which writer threads drain with write(task, data). When the writers fall
+    behind the queue fills up and the downloaders block, so at most queue_size
+    results are held at a time. Failed fetches and writes are retried with
+    exponential backoff. cleanup(task, data), if given, runs once a result has
+    been written or given up on.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        fetch: Callable[[FetchTask], Any],
+        write: Callable[[FetchTask, Any], None],
+        cleanup: Callable[[FetchTask, Any], None] = None,
+        downloaders: int = 4,
+        writers: int = 2,
+        queue_size: int = 8,
+        retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self._fetch = fetch
+        self._write = write
+        self._cleanup = cleanup
+        self._downloaders = max(downloaders, 1)
+        self._writers = max(writers, 1)
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._retries = retries
+        self._backoff = backoff
+        self._failed = []
+        self._failed_lock = threading.Lock()
+
+    def run(self, tasks: List[FetchTask]) -> List[Tuple[FetchTask, Exception]]:
+        """
+        Run all tasks and return the ones that still failed after retrying, with
+        their last error.
+        """
+        if not tasks:
+            return []
+
+        writer_threads = [
+            threading.Thread(target=self._write_loop, daemon=True)
+            for _ in range(min(self._writers, len(tasks)))
+        ]
+        for thread in writer_threads:
+            thread.start()
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(self._downloaders, len(tasks))
+            ) as executor:
+                list(executor.map(self._download, tasks))
+        finally:
+            for _ in writer_threads:
+                self._queue.put(self._DONE)
+            for thread in writer_threads:
+                thread.join()
+
+        return self._failed
+
+    def _download(self, task: FetchTask) -> None:
+        try:
+            data = self._with_retry(f"download {task}", self._fetch, task)
+        except Exception as error:
+            self._record_failure(task, error)
+            return
+        # blocks while the queue is full
+        self._queue.put((task, data))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            task, data = item
+            try:
+                self._with_retry(f"insert {task}", self._write, task, data)
+            except Exception as error:
+                self._record_failure(task, error)
+            finally:
+                if self._cleanup is not None:
+                    self._cleanup(task, data)
+
+    def _with_retry(self, description: str, function: Callable, *args) -> Any:
+        """
+        Call function, retrying up to self._retries times with exponential backoff.
+        """
+        for attempt in range(self._retries + 1):
+            try:
+                return function(*args)
+            except Exception as error:
+                if attempt == self._retries:
+                    raise
+                delay = self._backoff * 2**attempt
+                print(f"Failed to {description} ({error}), retrying in {delay:g}s.")
+                time.sleep(delay)
+
+    def _record_failure(self, task: FetchTask, error: Exception) -> None:
+        print(f"Giving up on {task}: {error}")
+        with self._failed_lock:
+            self._failed.append((task, error))
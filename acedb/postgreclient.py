@@ -1,27 +1,94 @@
 import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+import psycopg2.pool
 import io
-from typing import List, Dict, Any, Tuple
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Tuple, Iterator
 import polars as pl
 import pandas as pd
+import pyarrow as pa
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from dateutil.relativedelta import relativedelta
 
+from . import pgcopy
+from .ranges import RangeIndex
 
 TYPE_MAP = {
-    "int": "NUMERIC",
-    "float": "NUMERIC",
-    "string": "VARCHAR(255)",
-    "float64": "NUMERIC",
+    "int": "BIGINT",
+    "float": "DOUBLE PRECISION",
+    "string": "TEXT",
+    "bool": "BOOLEAN",
+    "timestamp": "TIMESTAMP",
+    # Databento field types
+    "int64_t": "BIGINT",
+    "uint64_t": "BIGINT",
+    "int32_t": "INTEGER",
+    "uint32_t": "BIGINT",
+    "int16_t": "SMALLINT",
+    "uint16_t": "INTEGER",
+    "int8_t": "SMALLINT",
+    "uint8_t": "SMALLINT",
+    "char": "TEXT",
+    # pandas dtypes
+    "int64": "BIGINT",
+    "float64": "DOUBLE PRECISION",
+    "object": "TEXT",
     "datetime64[ns]": "TIMESTAMP",
     "datetime64[ns, UTC]": "TIMESTAMP",
 }
 
+COPY_READ_SIZE = 1 << 20
+
+# retrieved data is decoded into Polars and returned as one of these
+RESULT_TYPES = ("pandas", "polars", "lazy", "arrow")
+Result = pd.DataFrame | pl.DataFrame | pl.LazyFrame | pa.Table
+
+# market data tables are range partitioned on ts_event by one of these intervals,
+# which is recorded in the table comment
+PARTITION_COMMENT = "acedb:partition_interval="
+PARTITION_TRUNCATE = {"day": "1d", "week": "1w", "month": "1mo", "year": "1y"}
+PARTITION_FORMATS = {"day": "%Y%m%d", "week": "%Y%m%d", "month": "%Y%m", "year": "%Y"}
+# blocks other writers of the ranges table but not readers
+RANGE_LOCK_QUERY = 'LOCK TABLE "time".time_range IN SHARE ROW EXCLUSIVE MODE'
+
+# FRED series are stored one row per observation date and release
+FRED_COLUMNS = (
+    '"realtime_start" DATE NOT NULL, "date" DATE NOT NULL, "value" DOUBLE PRECISION'
+)
+FRED_TYPES = {"realtime_start": "date", "date": "date", "value": "double precision"}
+# columns of the old wide FRED layout were named by observation date
+FRED_DATE_COLUMN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+PARTITION_LENGTH = {
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+    "year": relativedelta(years=1),
+}
+
 
 class PostgreDBClient:
 
-    def __init__(self, host, port, db_name, username, password):
+    def __init__(
+        self,
+        host,
+        port,
+        db_name,
+        username,
+        password,
+        min_connections: int = 1,
+        max_connections: int = 8,
+    ):
         try:
-            conn = psycopg2.connect(
+            self._pool = psycopg2.pool.ThreadedConnectionPool(
+                min_connections,
+                max_connections,
                 host=host,
                 port=port,
                 dbname=db_name,
@@ -29,31 +96,171 @@ class PostgreDBClient:
                 password=password,
                 connect_timeout=5,
             )
-            self._cursor = conn.cursor()
 
         except:
             print("Error connecting to the database. Please check your configuration.")
             raise
 
+        # the pool raises when exhausted, so threads wait here for a free connection
+        self._pool_slots = threading.BoundedSemaphore(max_connections)
+        self.max_connections = max_connections
+        self._partition_intervals = {}
+        self._known_partitions = set()
+        # whether each (schema, table) has its natural key index
+        self._unique_keys = {}
+        # (schema, table) pairs whose lookup indexes were checked
+        self._indexed_tables = set()
+        self._range_index = RangeIndex()
+        # whether "time".time_range has its unique key, None until checked
+        self._range_key = None
+        self._symbology_checked = False
+        self._fred_sync_checked = False
+
         print("Database connection established.")
 
+    @contextmanager
+    def _connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """
+        Check a connection out of the pool for the duration of one operation.
+
+        The transaction is committed when the block exits and rolled back if it raises.
+        """
+        with self._pool_slots:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+
+    @contextmanager
+    def _get_cursor(self) -> Iterator[psycopg2.extensions.cursor]:
+        """
+        Get a cursor on a pooled connection for the duration of one operation.
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+        """
+        self._pool.closeall()
+
     def _insert_data(
-        self, sql_schema: str, table_name: str, data: pd.DataFrame
+        self,
+        sql_schema: str,
+        table_name: str,
+        data: pd.DataFrame | pl.DataFrame,
+        chunk_rows: int = 100_000,
+        conflict_key: List[str] = None,
+        replace_symbols: List[str] = None,
+        replace_ranges: List[Tuple[datetime, datetime]] = None,
     ) -> None:
         """
         Insert data into the database.
+
+        Rows are streamed to COPY FROM in chunks of chunk_rows, in binary format
+        when every column has a native type and as CSV otherwise (e.g. NUMERIC).
+
+        With a conflict_key the rows are copied into a temporary staging table and
+        merged with ON CONFLICT DO NOTHING against a unique index on those columns,
+        so rows that are already stored are skipped. If the index is missing and
+        the table belongs to another role, stored rows are skipped with an
+        anti-join instead.
+
+        With replace_ranges, the stored rows of replace_symbols in those [start, end)
+        windows are deleted in the same transaction, for schemas whose records
+        have no natural key. Windows are matched on ts_recv when the table has it,
+        the timestamp Databento selects those records by.
         """
-        cols = data.columns
-        io_buffer = io.StringIO()
-        data.to_csv(io_buffer, index=False)
-        io_buffer.seek(0)
+        if isinstance(data, pd.DataFrame):
+            data = pl.from_pandas(data)
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
+        table = f'"{sql_schema}"."{table_name}"'
+
+        self._ensure_partitions(sql_schema, table_name, data)
+
+        pg_types = self._get_column_types(sql_schema, table_name)
+        if conflict_key and not all(col in pg_types for col in conflict_key):
+            print(
+                f"Key {conflict_key} not in {sql_schema}.{table_name}, not deduplicating."
+            )
+            conflict_key = None
+        has_key_index = bool(conflict_key) and self._ensure_unique_key(
+            sql_schema, table_name, conflict_key
+        )
+
+        data = data.select([col for col in data.columns if col in pg_types])
+        col_list = ", ".join(f'"{col}"' for col in data.columns)
+
+        if pgcopy.binary_supported(data, pg_types):
+            copy_format = "binary"
+            chunks = pgcopy.binary_chunks(data, pg_types, chunk_rows)
+        else:
+            copy_format = "csv"
+            chunks = pgcopy.csv_chunks(data, chunk_rows)
+
+        with self._get_cursor() as cursor:
+            if replace_ranges:
+                time_col = "ts_recv" if "ts_recv" in pg_types else "ts_event"
+                windows = " OR ".join(
+                    f'("{time_col}" >= %s AND "{time_col}" < %s)'
+                    for _ in replace_ranges
+                )
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE symbol = ANY(%s) AND ({windows})",
+                    [list(replace_symbols)]
+                    + [bound for window in replace_ranges for bound in window],
+                )
+                if cursor.rowcount:
+                    print(
+                        f"Replacing {cursor.rowcount} stored rows in {sql_schema}.{table_name}."
+                    )
+
+            target = table
+            if conflict_key:
+                target = f"staging_{uuid.uuid4().hex}"
+                cursor.execute(
+                    f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
 
-        copy_query = f' COPY "{sql_schema}"."{table_name}" FROM STDIN WITH CSV HEADER'
+            copy_query = (
+                f"COPY {target} ({col_list}) FROM STDIN WITH (FORMAT {copy_format})"
+            )
+            cursor.copy_expert(
+                copy_query, pgcopy.IteratorReader(chunks), size=COPY_READ_SIZE
+            )
+
+            if conflict_key:
+                key_list = ", ".join(f'"{col}"' for col in conflict_key)
+                if has_key_index:
+                    cursor.execute(
+                        f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {target} "
+                        f"ON CONFLICT ({key_list}) DO NOTHING"
+                    )
+                else:
+                    # without the index, ON CONFLICT has no arbiter, so stored rows
+                    # are skipped with an anti-join instead
+                    key_match = " AND ".join(
+                        f't."{col}" = s."{col}"' for col in conflict_key
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {table} ({col_list}) SELECT DISTINCT ON ({key_list}) "
+                        f"{col_list} FROM {target} s WHERE NOT EXISTS "
+                        f"(SELECT 1 FROM {table} t WHERE {key_match})"
+                    )
+                skipped = data.height - cursor.rowcount
+                if skipped:
+                    print(
+                        f"Skipped {skipped} rows already in {sql_schema}.{table_name}."
+                    )
 
-        self._cursor.copy_expert(copy_query, io_buffer)
-        self._cursor.connection.commit()
         print(f"Data inserted into {sql_schema}.{table_name}.")
 
     def _retrieve_data(
@@ -63,42 +270,327 @@ class PostgreDBClient:
         symbol: str | List[str] = None,
         start: datetime = None,
         end: datetime = None,
-    ) -> pd.DataFrame:
+        use_copy: bool = True,
+        parallel: int = None,
+        result_type: str = "pandas",
+    ) -> Result:
         """
         Retrieve data from the database.
+
+        By default the data is read with COPY TO and decoded into native columns,
+        the cursor path is kept for use_copy=False. With parallel > 1 the query is
+        split into shards that run on that many pooled connections. The result is
+        returned as one of RESULT_TYPES.
+        """
+        if parallel and parallel > 1:
+            return self._to_result(
+                self._retrieve_parallel(
+                    sql_schema=sql_schema,
+                    table_name=table_name,
+                    symbol=symbol,
+                    start=start,
+                    end=end,
+                    workers=parallel,
+                ),
+                result_type,
+            )
+
+        if use_copy:
+            return self._to_result(
+                self._retrieve_polars(
+                    sql_schema=sql_schema,
+                    table_name=table_name,
+                    symbol=symbol,
+                    start=start,
+                    end=end,
+                ),
+                result_type,
+            )
+
+        select_query, params = self._build_select_query(
+            sql_schema=sql_schema,
+            table_name=table_name,
+            symbol=symbol,
+            start=start,
+            end=end,
+        )
+        with self._get_cursor() as cursor:
+            cursor.execute(select_query, params)
+            data = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+        df = self._rows_to_polars(data, columns).sort("ts_event")
+        return self._to_result(df, result_type)
+
+    def _retrieve_polars(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbol: str | List[str] = None,
+        start: datetime = None,
+        end: datetime = None,
+    ) -> pl.DataFrame:
+        """
+        Retrieve data from the database as a Polars DataFrame via COPY TO.
+        """
+        select_query, params = self._build_select_query(
+            sql_schema=sql_schema,
+            table_name=table_name,
+            symbol=symbol,
+            start=start,
+            end=end,
+        )
+        with self._get_cursor() as cursor:
+            df = self._copy_query(
+                cursor,
+                select_query,
+                params,
+                pg_types=self._get_column_types(sql_schema, table_name, cursor=cursor),
+            )
+        return df.sort("ts_event")
+
+    def _retrieve_parallel(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbol: str | List[str] = None,
+        start: datetime = None,
+        end: datetime = None,
+        workers: int = 4,
+        symbols_per_shard: int = 50,
+        slice_length: timedelta = timedelta(days=30),
+    ) -> pl.DataFrame:
+        """
+        Retrieve data as a Polars DataFrame, split into (symbol group x time slice)
+        shards that are read concurrently over separate pooled connections.
+
+        Shards of the same time slice are sorted together and the slices are
+        concatenated in time order without rechunking, so the result is ordered by
+        ts_event without another full copy.
+        """
+        symbols = [symbol] if isinstance(symbol, str) else symbol
+        groups = (
+            [
+                symbols[i : i + symbols_per_shard]
+                for i in range(0, len(symbols), symbols_per_shard)
+            ]
+            if symbols
+            else [None]
+        )
+
+        with self._get_cursor() as cursor:
+            pg_types = self._get_column_types(sql_schema, table_name, cursor=cursor)
+            if not start or not end:
+                bounds_query, params = self._build_select_query(
+                    sql_schema=sql_schema,
+                    table_name=table_name,
+                    symbol=symbols,
+                    start=start,
+                    end=end,
+                    columns="MIN(ts_event), MAX(ts_event)",
+                )
+                cursor.execute(bounds_query, params)
+                min_time, max_time = cursor.fetchone()
+                start = start or min_time
+                end = end or max_time
+
+        if start is None or end is None:
+            # empty table
+            return self._retrieve_polars(sql_schema, table_name, symbols, start, end)
+
+        slices = []
+        slice_start = start
+        while True:
+            slice_end = slice_start + slice_length
+            if slice_end >= end:
+                slices.append((slice_start, end, False))
+                break
+            slices.append((slice_start, slice_end, True))
+            slice_start = slice_end
+
+        def retrieve_shard(shard):
+            (slice_start, slice_end, end_exclusive), group = shard
+            select_query, params = self._build_select_query(
+                sql_schema=sql_schema,
+                table_name=table_name,
+                symbol=group,
+                start=slice_start,
+                end=slice_end,
+                end_exclusive=end_exclusive,
+            )
+            with self._get_cursor() as cursor:
+                return self._copy_query(cursor, select_query, params, pg_types)
+
+        shards = [(time_slice, group) for time_slice in slices for group in groups]
+        with ThreadPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            frames = list(executor.map(retrieve_shard, shards))
+
+        slice_frames = [
+            pl.concat(frames[i : i + len(groups)]).sort("ts_event")
+            for i in range(0, len(frames), len(groups))
+        ]
+        return pl.concat(slice_frames, rechunk=False)
+
+    @staticmethod
+    def _copy_query(
+        cursor, query: str, params: list, pg_types: Dict[str, str]
+    ) -> pl.DataFrame:
+        """
+        Run a query through COPY TO STDOUT and decode it into a Polars DataFrame.
+        """
+        query = cursor.mogrify(query, params).decode()
+        buffer = io.BytesIO()
+        cursor.copy_expert(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer
+        )
+        return pgcopy.read_csv(buffer, pg_types)
+
+    @staticmethod
+    def _rows_to_polars(data: List[tuple], columns: List[str]) -> pl.DataFrame:
+        """
+        Build a Polars DataFrame from cursor rows. psycopg2 already returns
+        timestamps as datetimes, so no parsing is needed.
+        """
+        return pl.DataFrame(
+            data, schema=columns, orient="row", infer_schema_length=None
+        )
+
+    @staticmethod
+    def _cast_to_pg_types(df: pl.DataFrame, pg_types: Dict[str, str]) -> pl.DataFrame:
+        """
+        Cast retrieved rows to the Polars types of their Postgres columns, so a
+        column has the same type in every chunk, even when it is all null.
+        """
+        return df.cast(
+            {
+                col: pgcopy.PG_TO_POLARS.get(pgcopy.base_type(pg_types[col]), pl.Utf8)
+                for col in df.columns
+                if col in pg_types
+            }
+        )
+
+    @staticmethod
+    def _to_result(df: pl.DataFrame, result_type: str) -> Result:
+        """
+        Convert a retrieved Polars DataFrame into the requested result type.
+        """
+        if result_type == "polars":
+            return df
+        if result_type == "lazy":
+            return df.lazy()
+        if result_type == "arrow":
+            return df.to_arrow()
+        if result_type == "pandas":
+            return df.to_pandas()
+        raise ValueError(
+            f"Unknown result_type {result_type}, expected one of {RESULT_TYPES}."
+        )
+
+    def _stream_data(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbol: str | List[str] = None,
+        start: datetime = None,
+        end: datetime = None,
+        chunk_size: int = 100_000,
+        result_type: str = "pandas",
+    ) -> Iterator[Result]:
+        """
+        Retrieve data from the database in chunks of at most chunk_size rows.
+        """
+        select_query, params = self._build_select_query(
+            sql_schema=sql_schema,
+            table_name=table_name,
+            symbol=symbol,
+            start=start,
+            end=end,
+            order_by="ts_event",
+        )
+        yield from self._stream_query(
+            select_query,
+            params,
+            chunk_size,
+            result_type=result_type,
+            pg_types=self._get_column_types(sql_schema, table_name),
+        )
+
+    def _build_select_query(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbol: str | List[str] = None,
+        start: datetime = None,
+        end: datetime = None,
+        order_by: str = None,
+        end_exclusive: bool = False,
+        columns: str = "*",
+    ) -> Tuple[str, list]:
+        """
+        Build the SELECT query and its parameters for a symbol and date filter.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
 
+        conditions = []
+        params = []
         if isinstance(symbol, str):
-            symbol = self._convert_for_SQL(symbol)
-            symbol_query = f" WHERE symbol = '{symbol}'"
+            conditions.append("symbol = %s")
+            params.append(symbol)
         elif isinstance(symbol, list):
-            symbol = [self._convert_for_SQL(s) for s in symbol]
-            symbol_query = f" WHERE symbol IN ({', '.join(map(repr, symbol))})"
-        else:
-            symbol_query = ""
-
-        if start and end:
-            date_query = f" AND ts_event BETWEEN '{start}' AND '{end}'"
-        elif start:
-            date_query = f" AND ts_event >= '{start}'"
-        elif end:
-            date_query = f" AND ts_event <= '{end}'"
-        else:
-            date_query = ""
+            conditions.append("symbol = ANY(%s)")
+            params.append(symbol)
 
-        select_query = (
-            f'SELECT * FROM "{sql_schema}"."{table_name}" '
-            + f"{symbol_query} {date_query}"
-        )
-        self._cursor.execute(select_query)
-        data = self._cursor.fetchall()
-        columns = [col[0] for col in self._cursor.description]
-        df = pd.DataFrame(data, columns=columns)
-        df["ts_event"] = pd.to_datetime(df["ts_event"], format="%Y-%m-%d %H:%M:%S")
-        df = df.sort_values(by=["ts_event"])
-        return df
+        if start:
+            conditions.append("ts_event >= %s")
+            params.append(start)
+        if end:
+            conditions.append("ts_event < %s" if end_exclusive else "ts_event <= %s")
+            params.append(end)
+
+        select_query = f'SELECT {columns} FROM "{sql_schema}"."{table_name}"'
+        if conditions:
+            select_query += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            select_query += f" ORDER BY {order_by}"
+
+        return select_query, params
+
+    def _stream_query(
+        self,
+        query: str,
+        params: list,
+        chunk_size: int,
+        temp_symbols: List[str] = None,
+        result_type: str = "pandas",
+        pg_types: Dict[str, str] = None,
+    ) -> Iterator[Result]:
+        """
+        Run a query on a named (server-side) cursor and yield DataFrame chunks.
+
+        Only chunk_size rows are held on the client at a time. The stream keeps its
+        pooled connection checked out until it is exhausted or closed. With the
+        Postgres types of the columns, every chunk is cast to the same types, even
+        when a column of a chunk is all null.
+        """
+        with self._connection() as conn:
+            if temp_symbols is not None:
+                with conn.cursor() as setup_cursor:
+                    self._create_temp_symbols(
+                        setup_cursor, "temp_symbols", temp_symbols
+                    )
+
+            with conn.cursor(name=f"acedb_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(query, params)
+                while True:
+                    data = cursor.fetchmany(chunk_size)
+                    if not data:
+                        break
+                    columns = [col[0] for col in cursor.description]
+                    df = self._rows_to_polars(data, columns)
+                    if pg_types is not None:
+                        df = self._cast_to_pg_types(df, pg_types)
+                    yield self._to_result(df, result_type)
 
     ###### Checking database objects ######
 
@@ -124,11 +616,32 @@ class PostgreDBClient:
         sql_schema = self._convert_for_SQL(sql_schema)
 
         ds_check_query = "SELECT EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = %s) AS dataset_exists"
-        self._cursor.execute(ds_check_query, (sql_schema,))
-        exists = self._cursor.fetchone()
+        with self._get_cursor() as cursor:
+            cursor.execute(ds_check_query, (sql_schema,))
+            exists = cursor.fetchone()
 
         return bool(exists[0])
 
+    def _get_column_types(
+        self, sql_schema: str, table_name: str, cursor=None
+    ) -> Dict[str, str]:
+        """
+        Get the column names and Postgres types of a table, in table order.
+        """
+        if cursor is None:
+            with self._get_cursor() as cursor:
+                return self._get_column_types(sql_schema, table_name, cursor=cursor)
+
+        sql_schema = self._convert_for_SQL(sql_schema)
+        table_name = self._convert_for_SQL(table_name)
+        column_query = (
+            "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped "
+            "ORDER BY attnum"
+        )
+        cursor.execute(column_query, (f'"{sql_schema}"."{table_name}"',))
+        return {name: pg_type for name, pg_type in cursor.fetchall()}
+
     def _check_table_in_database(self, sql_schema: str, table_name: str) -> bool:
         """
         Check if the table exists in the database.
@@ -136,107 +649,546 @@ class PostgreDBClient:
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
         table_check_query = "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_schema = %s AND table_name = %s) AS table_exists"
-        self._cursor.execute(table_check_query, (sql_schema, table_name))
-        exists = self._cursor.fetchone()
+        with self._get_cursor() as cursor:
+            cursor.execute(table_check_query, (sql_schema, table_name))
+            exists = cursor.fetchone()
         return bool(exists[0])
 
-    def _ensure_columns_exist(
-        self, sql_schema: str, table_name: str, col_dict: List[Dict[str, str]]
+    ##### Time #####
+
+    def retrieve_ranges_bulk(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbols: List[str],
+        refresh: bool = False,
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Retrieve the ranges of data for many symbols of a table.
+
+        Ranges are answered from the in-process range index; symbols that are not
+        indexed yet, or all of them with refresh (e.g. to see ranges written by
+        other processes), are loaded with a single query.
+        """
+        sql_schema = self._convert_for_SQL(sql_schema)
+        table_name = self._convert_for_SQL(table_name)
+        keys = [(sql_schema, table_name, symbol) for symbol in symbols]
+
+        missing_keys = keys if refresh else self._range_index.missing_keys(keys)
+        if missing_keys:
+            query = """ SELECT "schema", "table", "symbol", request_start, request_end FROM "time".time_range WHERE "schema" = %s AND "table" = %s AND "symbol" = ANY(%s)"""
+            with self._get_cursor() as cursor:
+                cursor.execute(
+                    query, (sql_schema, table_name, [key[2] for key in missing_keys])
+                )
+                self._range_index.load(missing_keys, cursor.fetchall())
+
+        return {key[2]: self._range_index.get(key) or [] for key in keys}
+
+    def _retrieve_all_ranges(
+        self, sql_schema: str = None, table_name: str = None, symbol: str = None
+    ) -> Dict[Tuple[str, str, str], List[Tuple[datetime, datetime]]]:
+        """
+        Retrieve the ranges of every (schema, table, symbol) matching the filters
+        with one query, and index them.
+        """
+        conditions = []
+        params = []
+        if sql_schema:
+            conditions.append('"schema" = %s')
+            params.append(self._convert_for_SQL(sql_schema))
+        if table_name:
+            conditions.append('"table" = %s')
+            params.append(self._convert_for_SQL(table_name))
+        if symbol:
+            conditions.append('"symbol" = %s')
+            params.append(symbol)
+
+        query = """ SELECT "schema", "table", "symbol", request_start, request_end FROM "time".time_range"""
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._get_cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+        keys = list(dict.fromkeys(row[:3] for row in rows))
+        self._range_index.load(keys, rows)
+        return {key: self._range_index.get(key) for key in keys}
+
+    def _append_ranges(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbol: str | List[str],
+        ranges: List[Tuple[datetime, datetime]],
     ) -> None:
         """
-        Ensure the columns exist in the table.
+        Append the ranges of data for a symbol, or for each of a list of symbols,
+        and merge them with the stored ranges of those symbols in the same
+        transaction.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
+        symbols = [symbol] if isinstance(symbol, str) else symbol
+        has_key = self._ensure_range_key()
 
-        for col in col_dict:
-            col_name = self._convert_for_SQL(col["name"])
-            col_type = TYPE_MAP.get(col["type"], col["type"])
+        # one row per key, as ON CONFLICT cannot update a row twice in a statement
+        rows = {}
+        for symbol in symbols:
+            for start, end in ranges:
+                key = (sql_schema, table_name, symbol, start)
+                rows[key] = max(rows.get(key, end), end)
 
-            column_check_query = (
-                "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
-                f"WHERE table_schema = %s AND table_name = %s AND column_name = %s) AS column_exists"
+        query = """ INSERT INTO "time".time_range ("schema", "table", "symbol", "request_start", "request_end") VALUES %s"""
+        if has_key:
+            query += """ ON CONFLICT ("schema", "table", "symbol", "request_start") DO UPDATE SET request_end = GREATEST(time_range.request_end, EXCLUDED.request_end)"""
+        # without the key, rows with the same start are merged by the compaction below
+        with self._get_cursor() as cursor:
+            # taken before writing, so concurrent appends queue up instead of deadlocking
+            cursor.execute(RANGE_LOCK_QUERY)
+            psycopg2.extras.execute_values(
+                cursor,
+                query,
+                [key + (end,) for key, end in rows.items()],
+                page_size=1000,
             )
-            self._cursor.execute(column_check_query, (sql_schema, table_name, col_name))
-            exists = self._cursor.fetchone()
+            self._compact_ranges(cursor, sql_schema, table_name, symbols)
+        self._range_index.invalidate(
+            (sql_schema, table_name, symbol) for symbol in symbols
+        )
 
-            if not exists[0]:
-                alter_table_query = f'ALTER TABLE "{sql_schema}"."{table_name}" ADD COLUMN "{col_name}" {col_type}'
-                self._cursor.execute(alter_table_query)
-                print(f"Column {col_name} added to {sql_schema}.{table_name}.")
+    def compact_ranges(self, sql_schema: str = None, table_name: str = None) -> int:
+        """
+        Merge the overlapping and adjacent stored ranges of every symbol, optionally
+        only of one schema or table, in a single transaction. Returns the number of
+        rows removed.
+        """
+        sql_schema = self._convert_for_SQL(sql_schema) if sql_schema else None
+        table_name = self._convert_for_SQL(table_name) if table_name else None
+        with self._get_cursor() as cursor:
+            cursor.execute(RANGE_LOCK_QUERY)
+            removed = self._compact_ranges(cursor, sql_schema, table_name)
+        self._range_index.clear()
+        return removed
 
-        self._cursor.connection.commit()
+    @staticmethod
+    def _compact_ranges(
+        cursor,
+        sql_schema: str = None,
+        table_name: str = None,
+        symbols: List[str] = None,
+    ) -> int:
+        """
+        Replace the matching ranges of "time".time_range by their merged ranges.
 
-    ##### Time #####
+        Ranges are ordered by start per (schema, table, symbol), and a range starts
+        a new island when it begins after the end of every earlier range; each
+        island is then stored as one row. Returns the number of rows removed.
+        """
+        conditions = []
+        params = []
+        if sql_schema:
+            conditions.append('"schema" = %s')
+            params.append(sql_schema)
+        if table_name:
+            conditions.append('"table" = %s')
+            params.append(table_name)
+        if symbols is not None:
+            conditions.append('"symbol" = ANY(%s)')
+            params.append(list(symbols))
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+        cursor.execute(
+            f"""
+            CREATE TEMP TABLE compacted_ranges ON COMMIT DROP AS
+            WITH ordered AS (
+                SELECT "schema", "table", "symbol", request_start, request_end,
+                    MAX(request_end) OVER (
+                        PARTITION BY "schema", "table", "symbol"
+                        ORDER BY request_start, request_end
+                        ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                    ) AS previous_end
+                FROM "time".time_range{where}
+            ), islands AS (
+                SELECT *,
+                    SUM(CASE WHEN previous_end >= request_start THEN 0 ELSE 1 END) OVER (
+                        PARTITION BY "schema", "table", "symbol"
+                        ORDER BY request_start, request_end
+                    ) AS island
+                FROM ordered
+            )
+            SELECT "schema", "table", "symbol",
+                MIN(request_start) AS request_start, MAX(request_end) AS request_end
+            FROM islands
+            GROUP BY "schema", "table", "symbol", island
+            """,
+            params,
+        )
+        cursor.execute(f'DELETE FROM "time".time_range{where}', params)
+        removed = cursor.rowcount
+        cursor.execute(
+            """ INSERT INTO "time".time_range ("schema", "table", "symbol", "request_start", "request_end") SELECT "schema", "table", "symbol", request_start, request_end FROM compacted_ranges"""
+        )
+        removed -= cursor.rowcount
+        cursor.execute("DROP TABLE compacted_ranges")
+        return removed
+
+    def _ensure_range_key(self) -> bool:
+        """
+        Ensure the unique index on (schema, table, symbol, request_start) of
+        "time".time_range, compacting the table first if it holds duplicates.
+        Returns whether the index exists.
+        """
+        if self._range_key is None:
+            self._range_key = self._ensure_unique_index(
+                "time",
+                "time_range",
+                "time_range_key",
+                '"schema", "table", "symbol", request_start',
+                self._compact_all_ranges,
+            )
+        return self._range_key
+
+    def _compact_all_ranges(self) -> None:
+        print("Compacting stored ranges...")
+        self.compact_ranges()
+
+    ##### Symbology #####
+
+    def _ensure_symbology_table(self) -> None:
+        """
+        Create "time".symbology, which maps parent symbols to their child symbols
+        and the dates each child is valid.
+        """
+        if self._symbology_checked:
+            return
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """ CREATE TABLE IF NOT EXISTS "time".symbology ("dataset" TEXT NOT NULL, "parent" TEXT NOT NULL, "symbol" TEXT NOT NULL, "valid_from" DATE NOT NULL, "valid_to" DATE NOT NULL, PRIMARY KEY ("dataset", "parent", "symbol", "valid_from"))"""
+            )
+        self._symbology_checked = True
 
-    def _get_max_time(
-        self, sql_schema: str, table_name: str, symbol: str = None
-    ) -> datetime | None:
+    def _insert_symbology(
+        self, sql_schema: str, parent: str, mappings: List[Tuple[str, date, date]]
+    ) -> None:
+        """
+        Store the (symbol, valid_from, valid_to) children of a parent symbol.
+        """
+        self._ensure_symbology_table()
+        if not mappings:
+            return
+        sql_schema = self._convert_for_SQL(sql_schema)
+        rows = [
+            (sql_schema, parent, symbol, valid_from, valid_to)
+            for symbol, valid_from, valid_to in mappings
+        ]
+        query = """ INSERT INTO "time".symbology ("dataset", "parent", "symbol", "valid_from", "valid_to") VALUES %s ON CONFLICT ("dataset", "parent", "symbol", "valid_from") DO UPDATE SET valid_to = GREATEST(symbology.valid_to, EXCLUDED.valid_to)"""
+        with self._get_cursor() as cursor:
+            psycopg2.extras.execute_values(cursor, query, rows, page_size=1000)
+
+    def _retrieve_children(
+        self,
+        sql_schema: str,
+        parents: List[str],
+        start: datetime = None,
+        end: datetime = None,
+    ) -> List[str]:
+        """
+        Get the stored child symbols of parent symbols that are valid at any time
+        between start and end.
+        """
+        self._ensure_symbology_table()
+        conditions = ['"dataset" = %s', '"parent" = ANY(%s)']
+        params = [self._convert_for_SQL(sql_schema), parents]
+        if start:
+            conditions.append('"valid_to" >= %s')
+            params.append(start.date())
+        if end:
+            conditions.append('"valid_from" <= %s')
+            params.append(end.date())
+
+        query = (
+            """ SELECT DISTINCT "symbol" FROM "time".symbology WHERE """
+            + " AND ".join(conditions)
+        )
+        with self._get_cursor() as cursor:
+            cursor.execute(query, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    ##### FRED #####
+
+    def _create_fred_table(self, sql_schema: str, table_name: str) -> None:
         """
-        Get the maximum time from the database.
+        Create a table of FRED vintages, one (realtime_start, date, value) row per
+        observation and release.
+
+        The unique index on (date, realtime_start DESC) is the natural key and
+        serves as-of lookups; the index on (realtime_start, date) serves queries by
+        release.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
-        if symbol:
-            symbol = self._convert_for_SQL(symbol)
-            symbol_query = f" WHERE symbol = {symbol}"
-        else:
-            symbol_query = ""
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{sql_schema}"."{table_name}" '
+                f"({FRED_COLUMNS})"
+            )
+            self._create_fred_indexes(cursor, sql_schema, table_name)
+        print(f"Table {table_name} created in Schema {sql_schema}.")
 
-        max_time_query = (
-            f'SELECT MAX(ts_event) FROM "{sql_schema}"."{table_name}" '
-            + f"{symbol_query}"
+    @staticmethod
+    def _create_fred_indexes(cursor, sql_schema: str, table_name: str) -> None:
+        table = f'"{sql_schema}"."{table_name}"'
+        # named like _ensure_unique_key names its index, so inserts reuse it
+        cursor.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{table_name}_natural_key" '
+            f'ON {table} ("date", "realtime_start" DESC)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table_name}_realtime_start_idx" '
+            f'ON {table} ("realtime_start", "date")'
         )
-        self._cursor.execute(max_time_query)
-        max_time = self._cursor.fetchone()
 
-        return max_time[0] if max_time[0] else None
+    def _list_wide_fred_tables(
+        self, sql_schema: str, tables: List[str] = None
+    ) -> Dict[str, bool]:
+        """
+        List the FRED tables that still have the old layout, one row per release
+        with a column per observation date, mapped to whether the current role
+        owns them and so can migrate them. tables limits the listing to these.
+        """
+        query = (
+            "SELECT c.relname, pg_has_role(c.relowner, 'USAGE') FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = %s AND c.relkind = 'r' "
+            "AND EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.oid "
+            "AND a.attname = 'ts_event' AND NOT a.attisdropped) "
+            "AND NOT EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.oid "
+            "AND a.attname = 'realtime_start' AND NOT a.attisdropped)"
+        )
+        params = [self._convert_for_SQL(sql_schema)]
+        if tables is not None:
+            query += " AND c.relname = ANY(%s)"
+            params.append([self._convert_for_SQL(table) for table in tables])
+        with self._get_cursor() as cursor:
+            cursor.execute(query, params)
+            return {row[0]: row[1] for row in cursor.fetchall()}
 
-    def retrieve_ranges(
-        self, sql_schema: str, table_name: str, symbol
-    ) -> List[Tuple[datetime, datetime]]:
+    def _migrate_fred_to_long(self, sql_schema: str, table_name: str) -> int:
         """
-        Retrieve the ranges of data for a given symbol.
+        Convert a wide FRED table to the (realtime_start, date, value) layout in one
+        transaction and return the number of rows written.
+
+        The wide layout forward filled each release, so only values that differ
+        from the previous release of the same date are kept. Tables of series
+        without vintages have a single value column and become one row per date.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
+        table = f'"{sql_schema}"."{table_name}"'
+        long_name = f"{table_name}__long"
+        long_table = f'"{sql_schema}"."{long_name}"'
 
-        query = f""" SELECT request_start, request_end FROM "time".time_range WHERE "schema" = '{sql_schema}' AND "table" = '{table_name}' AND "symbol" = '{symbol}'"""
-        self._cursor.execute(query)
-        ranges = self._cursor.fetchall()
+        with self._get_cursor() as cursor:
+            value_columns = [
+                col
+                for col in self._get_column_types(sql_schema, table_name, cursor)
+                if col != "ts_event"
+            ]
+            cursor.execute(f"CREATE TABLE {long_table} ({FRED_COLUMNS})")
+            if all(FRED_DATE_COLUMN.fullmatch(col) for col in value_columns):
+                cursor.execute(
+                    f'INSERT INTO {long_table} ("realtime_start", "date", "value") '
+                    'SELECT "realtime_start", "date", "value" FROM ('
+                    ' SELECT w.ts_event::date AS "realtime_start", kv.key::date AS "date",'
+                    ' kv.value::double precision AS "value",'
+                    " LAG(kv.value::double precision) OVER"
+                    " (PARTITION BY kv.key ORDER BY w.ts_event) AS previous_value"
+                    f" FROM {table} w"
+                    " CROSS JOIN LATERAL jsonb_each_text(to_jsonb(w) - 'ts_event') AS kv(key, value)"
+                    " WHERE kv.value IS NOT NULL"
+                    ') v WHERE previous_value IS DISTINCT FROM "value"'
+                )
+            else:
+                cursor.execute(
+                    f'INSERT INTO {long_table} ("realtime_start", "date", "value") '
+                    f'SELECT ts_event::date, ts_event::date, "{value_columns[0]}" '
+                    f'FROM {table} WHERE "{value_columns[0]}" IS NOT NULL'
+                )
+            rows = cursor.rowcount
+            cursor.execute(f"DROP TABLE {table}")
+            cursor.execute(f'ALTER TABLE {long_table} RENAME TO "{table_name}"')
+            self._create_fred_indexes(cursor, sql_schema, table_name)
 
-        return [(r[0], r[1]) for r in ranges]
+        print(f"Migrated {sql_schema}.{table_name} to long format ({rows} rows).")
+        return rows
 
-    def _append_ranges(
+    def _ensure_fred_sync_table(self) -> None:
+        """
+        Create "time".fred_sync, which records for each FRED series whether it has
+        vintages, FRED's last_updated time when it was last synced and the sync
+        point, the latest stored realtime_start.
+        """
+        if self._fred_sync_checked:
+            return
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """ CREATE TABLE IF NOT EXISTS "time".fred_sync ("series" TEXT PRIMARY KEY, "vintages" BOOLEAN NOT NULL, "last_updated" TEXT, "sync_point" DATE, "synced_at" TIMESTAMPTZ NOT NULL DEFAULT now())"""
+            )
+        self._fred_sync_checked = True
+
+    def _get_fred_syncs(
+        self, table_names: List[str]
+    ) -> Dict[str, Tuple[bool, str, date]]:
+        """
+        Get the (vintages, last_updated, sync_point) of FRED series by table name.
+        Series that were never synced are left out.
+        """
+        self._ensure_fred_sync_table()
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """ SELECT "series", "vintages", "last_updated", "sync_point" FROM "time".fred_sync WHERE "series" = ANY(%s)""",
+                (self._convert_for_SQL(table_names),),
+            )
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def _get_fred_sync_point(self, sql_schema: str, table_name: str) -> date | None:
+        """
+        Get the latest stored realtime_start of a FRED table.
+        """
+        sql_schema = self._convert_for_SQL(sql_schema)
+        table_name = self._convert_for_SQL(table_name)
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                f'SELECT MAX("realtime_start") FROM "{sql_schema}"."{table_name}"'
+            )
+            return cursor.fetchone()[0]
+
+    def _set_fred_sync(
+        self, table_name: str, vintages: bool, last_updated: str, sync_point: date
+    ) -> None:
+        """
+        Record a sync of a FRED series.
+        """
+        self._ensure_fred_sync_table()
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """ INSERT INTO "time".fred_sync ("series", "vintages", "last_updated", "sync_point", "synced_at") VALUES (%s, %s, %s, %s, now()) ON CONFLICT ("series") DO UPDATE SET vintages = EXCLUDED.vintages, last_updated = EXCLUDED.last_updated, sync_point = EXCLUDED.sync_point, synced_at = EXCLUDED.synced_at""",
+                (self._convert_for_SQL(table_name), vintages, last_updated, sync_point),
+            )
+
+    def _build_fred_query(
         self,
         sql_schema: str,
         table_name: str,
-        symbol: str,
-        ranges: List[Tuple[datetime, datetime]],
-    ) -> None:
+        as_of: date | str = None,
+        start: datetime = None,
+        end: datetime = None,
+        columns: List[str] = None,
+        last: int = None,
+    ) -> Tuple[str, list]:
         """
-        Append the ranges of data for a given symbol.
+        Build the query for a FRED table, ordered by date and realtime_start.
+
+        Without as_of every vintage is returned. With a date, each observation's
+        value as it was known on that date, and with "latest" its latest value.
+        start and end bound the observation dates, columns selects a subset of
+        realtime_start, date and value, and last keeps only the last observation
+        dates.
         """
+        columns = columns or list(FRED_TYPES)
+        unknown = [col for col in columns if col not in FRED_TYPES]
+        if unknown:
+            raise ValueError(
+                f"Unknown FRED columns {unknown}, expected some of {list(FRED_TYPES)}."
+            )
+
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
+        table = f'"{sql_schema}"."{table_name}"'
 
-        for start, end in ranges:
-            query = f""" INSERT INTO "time".time_range ("schema", "table", "symbol", "request_start", "request_end") VALUES ('{sql_schema}', '{table_name}', '{symbol}', '{start}', '{end}')"""
-            self._cursor.execute(query)
+        conditions = []
+        params = []
+        if start:
+            conditions.append('"date" >= %s')
+            params.append(start)
+        if end:
+            conditions.append('"date" <= %s')
+            params.append(end)
+        if as_of is not None and as_of != "latest":
+            conditions.append('"realtime_start" <= %s')
+            params.append(as_of)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
 
-        self._cursor.connection.commit()
+        if as_of is None:
+            if last:
+                # every vintage of the last observation dates
+                conditions.append(
+                    f'"date" IN (SELECT DISTINCT "date" FROM {table}{where} '
+                    'ORDER BY "date" DESC LIMIT %s)'
+                )
+                params = params + params + [last]
+                where = " WHERE " + " AND ".join(conditions)
+            rows = f"SELECT * FROM {table}{where}"
+        elif last:
+            # walks the (date, realtime_start DESC) key backwards and stops early
+            rows = (
+                f'SELECT DISTINCT ON ("date") * FROM {table}{where} '
+                'ORDER BY "date" DESC, "realtime_start" DESC LIMIT %s'
+            )
+            params.append(last)
+        else:
+            rows = (
+                f'SELECT DISTINCT ON ("date") * FROM {table}{where} '
+                'ORDER BY "date", "realtime_start" DESC'
+            )
 
-    def _retrieve_existing_ranges(self):
+        select = ", ".join(f'"{col}"' for col in columns)
+        query = f'SELECT {select} FROM ({rows}) v ORDER BY "date", "realtime_start"'
+        return query, params
 
-        query = (
-            """ SELECT DISTINCT "schema", "table", "symbol" FROM "time".time_range"""
+    def _retrieve_fred(
+        self,
+        sql_schema: str,
+        table_name: str,
+        as_of: date | str = None,
+        start: datetime = None,
+        end: datetime = None,
+        columns: List[str] = None,
+        last: int = None,
+        result_type: str = "pandas",
+    ) -> Result:
+        """
+        Retrieve a FRED table, see _build_fred_query for the selection.
+        """
+        query, params = self._build_fred_query(
+            sql_schema, table_name, as_of, start, end, columns, last
+        )
+        with self._get_cursor() as cursor:
+            df = self._copy_query(cursor, query, params, pg_types=FRED_TYPES)
+        return self._to_result(df, result_type)
+
+    def _stream_fred(
+        self,
+        sql_schema: str,
+        table_name: str,
+        as_of: date | str = None,
+        start: datetime = None,
+        end: datetime = None,
+        columns: List[str] = None,
+        last: int = None,
+        chunk_size: int = 100_000,
+        result_type: str = "pandas",
+    ) -> Iterator[Result]:
+        """
+        Retrieve a FRED table in chunks of at most chunk_size rows.
+        """
+        query, params = self._build_fred_query(
+            sql_schema, table_name, as_of, start, end, columns, last
+        )
+        yield from self._stream_query(
+            query, params, chunk_size, result_type=result_type, pg_types=FRED_TYPES
         )
-        self._cursor.execute(query)
-        data = self._cursor.fetchall()
-        df = pd.DataFrame(data, columns=[col[0] for col in self._cursor.description])
-        df["schema"] = df["schema"].str.replace("_", ".")
-        df["table"] = df["table"].str.replace("_", "-")
-        return df
 
     ##### Create Database Objects #####
 
@@ -245,88 +1197,450 @@ class PostgreDBClient:
         Create the schema in the database.
         """
         create_schema_query = f'CREATE SCHEMA IF NOT EXISTS "{sql_schema}"'
-        self._cursor.execute(create_schema_query)
-        self._cursor.connection.commit()
+        with self._get_cursor() as cursor:
+            cursor.execute(create_schema_query)
         print(f"Schema {sql_schema} created.")
         self._add_permissions(sql_schema)
 
     def _create_table(
-        self, sql_schema: str, table_name: str, col_dict: List[Dict[str, str]]
+        self,
+        sql_schema: str,
+        table_name: str,
+        col_dict: List[Dict[str, str]],
+        partition_interval: str = None,
     ) -> None:
         """
         Create a table in the database.
+
+        With a partition_interval ("day", "week", "month" or "year") the table is
+        range partitioned by ts_event. Partitions are created by _insert_data as
+        data arrives. Tables are indexed by _ensure_table_indexes.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
+        table = f'"{sql_schema}"."{table_name}"'
 
-        create_schema_query = (
-            f'CREATE TABLE IF NOT EXISTS "{sql_schema}"."{table_name}"  '
-        )
+        create_schema_query = f"CREATE TABLE IF NOT EXISTS {table}  "
         col_defs = ",\n    ".join(
             f'"{col["name"]}" {TYPE_MAP.get(col["type"], col["type"])}'
             for col in col_dict
         )
         create_schema_query += f"({col_defs})"
 
-        self._cursor.execute(create_schema_query)
-        self._cursor.connection.commit()
+        if partition_interval:
+            if partition_interval not in PARTITION_FORMATS:
+                raise ValueError(
+                    f"Partition interval must be one of {list(PARTITION_FORMATS)}."
+                )
+            create_schema_query += " PARTITION BY RANGE (ts_event)"
+
+        with self._get_cursor() as cursor:
+            cursor.execute(create_schema_query)
+            if partition_interval:
+                cursor.execute(
+                    f"COMMENT ON TABLE {table} IS %s",
+                    (f"{PARTITION_COMMENT}{partition_interval}",),
+                )
 
         print(f"Table {table_name} created in Schema {sql_schema}.")
+        self._ensure_table_indexes(sql_schema, table_name)
+
+    def _ensure_table_indexes(self, sql_schema: str, table_name: str) -> None:
+        """
+        Ensure a Databento table is indexed on (symbol, ts_event) and with a BRIN
+        on ts_event, which tables created by older versions lack.
+
+        The catalog is read first, as CREATE INDEX IF NOT EXISTS still requires
+        owning the table. Indexing a large existing table blocks writes to it
+        until the index is built.
+        """
+        sql_schema = self._convert_for_SQL(sql_schema)
+        table_name = self._convert_for_SQL(table_name)
+        if (sql_schema, table_name) in self._indexed_tables:
+            return
+        table = f'"{sql_schema}"."{table_name}"'
+        indexes = {
+            f"{table_name}_symbol_ts_event_idx": "(symbol, ts_event)",
+            f"{table_name}_ts_event_brin": "USING brin (ts_event)",
+        }
+
+        with self._get_cursor() as cursor:
+            missing = []
+            for index_name in indexes:
+                cursor.execute(
+                    "SELECT to_regclass(%s) IS NULL",
+                    (f'"{sql_schema}"."{index_name}"',),
+                )
+                if cursor.fetchone()[0]:
+                    missing.append(index_name)
+        for index_name in missing:
+            print(f"Creating index {index_name} on {sql_schema}.{table_name}...")
+            try:
+                with self._get_cursor() as cursor:
+                    cursor.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+                        f"ON {table} {indexes[index_name]}"
+                    )
+            except psycopg2.errors.InsufficientPrivilege:
+                print(
+                    f"Cannot create index {index_name}: {sql_schema}.{table_name} "
+                    "is owned by another role."
+                )
+                break
+        self._indexed_tables.add((sql_schema, table_name))
+
+    def _list_tables(self, sql_schema: str = None) -> List[Tuple[str, str]]:
+        """
+        List the (schema, table) pairs of user tables in the database.
+        """
+        query = (
+            "SELECT n.nspname, c.relname FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition "
+            "AND n.nspname NOT IN ('pg_catalog', 'information_schema') "
+            "AND n.nspname NOT LIKE 'pg_%%'"
+        )
+        params = []
+        if sql_schema:
+            query += " AND n.nspname = %s"
+            params.append(self._convert_for_SQL(sql_schema))
+        query += " ORDER BY n.nspname, c.relname"
+
+        with self._get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def _migrate_column_types(
+        self,
+        sql_schema: str,
+        table_name: str,
+        targets: Dict[str, Tuple[str, str]],
+        batch_pages: int = 10_000,
+    ) -> None:
+        """
+        Rewrite a table with new column types.
+
+        targets maps column names to (new type, cast expression). The rows are
+        copied into a new table batch_pages heap pages at a time, committing after
+        every batch, and the new table then replaces the old one in one transaction.
+
+        Before PostgreSQL 14 a ctid range cannot be scanned directly, every batch
+        would read the whole table, so the rows are copied in one batch instead.
+        """
+        sql_schema = self._convert_for_SQL(sql_schema)
+        table_name = self._convert_for_SQL(table_name)
+        old_table = f'"{sql_schema}"."{table_name}"'
+        new_table = f'"{sql_schema}"."{table_name}__migrate"'
+
+        pg_types = self._get_column_types(sql_schema, table_name)
+        col_list = ", ".join(f'"{col}"' for col in pg_types)
+        select_list = ", ".join(
+            targets[col][1] if col in targets else f'"{col}"' for col in pg_types
+        )
+
+        with self._get_cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+            cursor.execute(f"CREATE TABLE {new_table} (LIKE {old_table} INCLUDING ALL)")
+            for col, (col_type, _) in targets.items():
+                cursor.execute(
+                    f'ALTER TABLE {new_table} ALTER COLUMN "{col}" TYPE {col_type}'
+                )
+            cursor.execute(
+                "SELECT pg_relation_size(%s) / current_setting('block_size')::int",
+                (old_table,),
+            )
+            n_pages = cursor.fetchone()[0]
+            cursor.execute("SHOW server_version_num")
+            if int(cursor.fetchone()[0]) < 140000:
+                print(
+                    "PostgreSQL 14 is required to migrate in batches, copying in one."
+                )
+                batch_pages = n_pages + 1
+
+        copied_pages = 0
+        for first_page in range(0, n_pages + 1, batch_pages):
+            with self._get_cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {new_table} ({col_list}) SELECT {select_list} FROM {old_table} "
+                    "WHERE ctid >= %s::tid AND ctid < %s::tid",
+                    (f"({first_page},0)", f"({first_page + batch_pages},0)"),
+                )
+            copied_pages = first_page + batch_pages
+            print(
+                f"Migrated pages {first_page} to {min(copied_pages, n_pages)} of {n_pages}."
+            )
+
+        with self._get_cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {old_table} IN ACCESS EXCLUSIVE MODE")
+            # rows appended while the batches ran
+            cursor.execute(
+                f"INSERT INTO {new_table} ({col_list}) SELECT {select_list} FROM {old_table} "
+                "WHERE ctid >= %s::tid",
+                (f"({copied_pages},0)",),
+            )
+            cursor.execute(f"DROP TABLE {old_table}")
+            cursor.execute(f'ALTER TABLE {new_table} RENAME TO "{table_name}"')
+
+        print(f"Table {table_name} in Schema {sql_schema} migrated.")
+
+    ##### Keys #####
+
+    def _ensure_unique_key(
+        self, sql_schema: str, table_name: str, key: List[str]
+    ) -> bool:
+        """
+        Ensure a unique index on the key columns, removing duplicate rows that
+        were stored before the table had one. Returns whether the index exists.
+        """
+        if (sql_schema, table_name) in self._unique_keys:
+            return self._unique_keys[(sql_schema, table_name)]
+
+        table = f'"{sql_schema}"."{table_name}"'
+        key_list = ", ".join(f'"{col}"' for col in key)
+
+        def remove_duplicates():
+            print(f"Removing duplicate rows from {sql_schema}.{table_name}...")
+            with self._get_cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE (tableoid, ctid) IN ("
+                    f"SELECT tableoid, ctid FROM (SELECT tableoid, ctid, row_number() "
+                    f"OVER (PARTITION BY {key_list} ORDER BY ctid) AS rn FROM {table}) d "
+                    "WHERE rn > 1)"
+                )
+                print(f"Removed {cursor.rowcount} duplicate rows.")
+
+        exists = self._ensure_unique_index(
+            sql_schema,
+            table_name,
+            f"{table_name}_natural_key",
+            key_list,
+            remove_duplicates,
+        )
+        self._unique_keys[(sql_schema, table_name)] = exists
+        return exists
+
+    def _ensure_unique_index(
+        self,
+        sql_schema: str,
+        table_name: str,
+        index_name: str,
+        key_list: str,
+        remove_duplicates: Callable[[], None],
+    ) -> bool:
+        """
+        Create a unique index unless it exists, and return whether it exists.
+
+        The catalog is read first, as CREATE INDEX IF NOT EXISTS still requires
+        owning the table; roles that do not own it get False when the index is
+        missing. If the table holds duplicate keys, remove_duplicates runs before
+        the index is created again. A concurrent create of the same index fails on
+        pg_class instead, and is not a duplicate in the table.
+        """
+        index = f'"{sql_schema}"."{index_name}"'
+        create_index_query = f'CREATE UNIQUE INDEX IF NOT EXISTS "{index_name}" ON "{sql_schema}"."{table_name}" ({key_list})'
+
+        def index_exists():
+            with self._get_cursor() as cursor:
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (index,))
+                return cursor.fetchone()[0]
+
+        if index_exists():
+            return True
+        try:
+            with self._get_cursor() as cursor:
+                cursor.execute(create_index_query)
+        except psycopg2.errors.InsufficientPrivilege:
+            print(
+                f"Cannot create index {index_name}: {sql_schema}.{table_name} "
+                "is owned by another role."
+            )
+            return False
+        except psycopg2.errors.UniqueViolation as error:
+            if error.diag.constraint_name != index_name:
+                # another process created the index at the same time
+                return index_exists()
+            remove_duplicates()
+            with self._get_cursor() as cursor:
+                cursor.execute(create_index_query)
+        return True
+
+    ##### Partitions #####
+
+    def _get_partition_interval(self, sql_schema: str, table_name: str, cursor) -> str:
+        """
+        Get the partition interval of a table, None if it is not partitioned.
+        """
+        key = (sql_schema, table_name)
+        if key not in self._partition_intervals:
+            cursor.execute(
+                "SELECT c.relkind = 'p', obj_description(c.oid, 'pg_class') "
+                "FROM pg_class c WHERE c.oid = to_regclass(%s)",
+                (f'"{sql_schema}"."{table_name}"',),
+            )
+            row = cursor.fetchone()
+            interval = None
+            if row and row[0] and (row[1] or "").startswith(PARTITION_COMMENT):
+                interval = row[1][len(PARTITION_COMMENT) :]
+            self._partition_intervals[key] = interval
+        return self._partition_intervals[key]
+
+    def _ensure_partitions(
+        self, sql_schema: str, table_name: str, data: pl.DataFrame
+    ) -> None:
+        """
+        Create the partitions of a partitioned table that the data falls into.
+        """
+        if "ts_event" not in data.columns or data.is_empty():
+            return
+
+        with self._get_cursor() as cursor:
+            interval = self._get_partition_interval(sql_schema, table_name, cursor)
+            if interval is None:
+                return
+
+            ts_event = data["ts_event"]
+            if ts_event.dtype.time_zone:
+                ts_event = ts_event.dt.replace_time_zone(None)
+            period_starts = (
+                ts_event.drop_nulls().dt.truncate(PARTITION_TRUNCATE[interval]).unique()
+            )
+
+            locked = False
+            for period_start in period_starts.sort():
+                period_end = period_start + PARTITION_LENGTH[interval]
+                suffix = period_start.strftime(PARTITION_FORMATS[interval])
+                partition = f"{table_name}_p{suffix}"
+                if (sql_schema, partition) in self._known_partitions:
+                    continue
+                if not locked:
+                    # concurrent CREATE TABLE IF NOT EXISTS of the same partition
+                    # can still fail on the catalog, so writers take turns until
+                    # the partitions are committed
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(%s::regclass::oid::bigint)",
+                        (f'"{sql_schema}"."{table_name}"',),
+                    )
+                    locked = True
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{sql_schema}"."{partition}" '
+                    f'PARTITION OF "{sql_schema}"."{table_name}" FOR VALUES FROM (%s) TO (%s)',
+                    (period_start, period_end),
+                )
+                self._known_partitions.add((sql_schema, partition))
 
     ##### Temporary Table #####
 
-    def _create_temp_symbols(self, table_name: str, symbols) -> None:
+    @staticmethod
+    def _create_temp_symbols(cursor, table_name: str, symbols) -> None:
         """
-        Create a temporary table in the database.
+        Create a temporary table of symbols on the cursor's connection.
+
+        Temporary tables are private to a connection, so the table is created on
+        the same checkout as the query using it and dropped when it commits.
         """
-        create_temp_table_query = f"CREATE TEMP TABLE {table_name} (symbol TEXT)"
-        self._cursor.execute(create_temp_table_query)
+        create_temp_table_query = (
+            f"CREATE TEMP TABLE IF NOT EXISTS {table_name} (symbol TEXT) ON COMMIT DROP"
+        )
+        cursor.execute(create_temp_table_query)
 
         buffer = io.StringIO()
         for symbol in symbols:
             buffer.write(f"{symbol}\n")
         buffer.seek(0)
-        buffer.seek(0)
-
-        self._cursor.copy_expert("COPY temp_symbols (symbol) FROM STDIN", buffer)
-        self._cursor.connection.commit()
 
-        self._cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
+        cursor.copy_expert(f"COPY {table_name} (symbol) FROM STDIN", buffer)
 
     def _retrieve_temp_symbols(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbols: List[str],
+        start: datetime = None,
+        end: datetime = None,
+        result_type: str = "pandas",
+    ) -> Result:
+        """
+        Retrieve data for many symbols by joining against a temporary table.
+        """
+        query, params = self._build_temp_symbols_query(
+            sql_schema=sql_schema,
+            table_name=table_name,
+            temp_table_name="temp_symbols",
+            start=start,
+            end=end,
+        )
+        with self._get_cursor() as cursor:
+            self._create_temp_symbols(cursor, "temp_symbols", symbols)
+            df = self._copy_query(
+                cursor,
+                query,
+                params,
+                pg_types=self._get_column_types(sql_schema, table_name, cursor=cursor),
+            )
+        return self._to_result(df.sort("ts_event"), result_type)
+
+    def _stream_temp_symbols(
+        self,
+        sql_schema: str,
+        table_name: str,
+        symbols: List[str],
+        start: datetime = None,
+        end: datetime = None,
+        chunk_size: int = 100_000,
+        result_type: str = "pandas",
+    ) -> Iterator[Result]:
+        """
+        Retrieve data for many symbols in chunks of at most chunk_size rows.
+        """
+        query, params = self._build_temp_symbols_query(
+            sql_schema=sql_schema,
+            table_name=table_name,
+            temp_table_name="temp_symbols",
+            start=start,
+            end=end,
+            order_by="t.ts_event",
+        )
+        yield from self._stream_query(
+            query,
+            params,
+            chunk_size,
+            temp_symbols=symbols,
+            result_type=result_type,
+            pg_types=self._get_column_types(sql_schema, table_name),
+        )
+
+    def _build_temp_symbols_query(
         self,
         sql_schema: str,
         table_name: str,
         temp_table_name: str,
         start: datetime = None,
         end: datetime = None,
-    ) -> pd.DataFrame:
+        order_by: str = None,
+    ) -> Tuple[str, list]:
         """
-        Retrieve symbols from the temporary table.
+        Build the query joining a table against the temporary symbols table.
         """
         sql_schema = self._convert_for_SQL(sql_schema)
         table_name = self._convert_for_SQL(table_name)
         temp_table_name = self._convert_for_SQL(temp_table_name)
 
-        if start and end:
-            date_query = f" WHERE t.ts_event BETWEEN '{start}' AND '{end}'"
-        elif start:
-            date_query = f" WHERE t.ts_event >= '{start}'"
-        elif end:
-            date_query = f" WHERE t.ts_event <= '{end}'"
-        else:
-            date_query = ""
+        conditions = []
+        params = []
+        if start:
+            conditions.append("t.ts_event >= %s")
+            params.append(start)
+        if end:
+            conditions.append("t.ts_event <= %s")
+            params.append(end)
 
-        query = (
-            f' SELECT t.* FROM "{sql_schema}"."{table_name}" t JOIN {temp_table_name} s ON t.symbol = s.symbol'
-            + date_query
-        )
-        self._cursor.execute(query)
-        data = self._cursor.fetchall()
-        df = pd.DataFrame(data, columns=[col[0] for col in self._cursor.description])
-        df["ts_event"] = pd.to_datetime(df["ts_event"], format="%Y-%m-%d %H:%M:%S")
+        query = f' SELECT t.* FROM "{sql_schema}"."{table_name}" t JOIN {temp_table_name} s ON t.symbol = s.symbol'
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            query += f" ORDER BY {order_by}"
 
-        return df
+        return query, params
 
     ##### Permissions #####
 
@@ -338,8 +1652,8 @@ class PostgreDBClient:
         query2 = f"""ALTER DEFAULT PRIVILEGES IN SCHEMA {sql_schema}
                     GRANT SELECT, INSERT, UPDATE, DELETE ON TABLES TO PUBLIC;"""
         query += query2
-        self._cursor.execute(query)
-        self._cursor.connection.commit()
+        with self._get_cursor() as cursor:
+            cursor.execute(query)
 
     @staticmethod
     def _convert_for_SQL(terms: List[str] | str) -> List[str]:
@@ -0,0 +1,52 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+RangeKey = Tuple[str, str, str]
+Range = Tuple[datetime, datetime]
+
+
+class RangeIndex:
+    """
+    In-process index of the stored ranges of each (schema, table, symbol), sorted
+    by start. A key that was loaded without any ranges is kept as an empty list,
+    so that symbols without data are not looked up again.
+    """
+
+    def __init__(self):
+        self._ranges: Dict[RangeKey, List[Range]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: RangeKey) -> List[Range] | None:
+        """
+        Get the ranges of a key, or None if the key is not loaded.
+        """
+        with self._lock:
+            ranges = self._ranges.get(key)
+            return list(ranges) if ranges is not None else None
+
+    def missing_keys(self, keys: Iterable[RangeKey]) -> List[RangeKey]:
+        with self._lock:
+            return [key for key in keys if key not in self._ranges]
+
+    def load(self, keys: Iterable[RangeKey], rows: Iterable[Tuple]) -> None:
+        """
+        Store the ranges of keys from (schema, table, symbol, start, end) rows.
+        Keys without rows are stored as empty.
+        """
+        loaded = {key: [] for key in keys}
+        for schema, table, symbol, start, end in rows:
+            loaded.setdefault((schema, table, symbol), []).append((start, end))
+        for ranges in loaded.values():
+            ranges.sort(key=lambda x: x[0])
+        with self._lock:
+            self._ranges.update(loaded)
+
+    def invalidate(self, keys: Iterable[RangeKey]) -> None:
+        with self._lock:
+            for key in keys:
+                self._ranges.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ranges.clear()
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+
+import pytest
+
+from acedb.postgreclient import PostgreDBClient
+from acedb.ranges import RangeIndex
+
+
+class RecordingCursor:
+    def __init__(self, rows):
+        self.queries = []
+        self._rows = rows
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture
+def range_client():
+    """
+    Build a database client without a connection, whose cursor records the
+    queries and returns the given "time".time_range rows.
+    """
+
+    def create(rows):
+        client = PostgreDBClient.__new__(PostgreDBClient)
+        client._range_index = RangeIndex()
+        cursor = RecordingCursor(rows)
+
+        @contextmanager
+        def get_cursor():
+            yield cursor
+
+        client._get_cursor = get_cursor
+        return client, cursor
+
+    return create
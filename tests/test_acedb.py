@@ -0,0 +1,26 @@
+import threading
+from datetime import datetime
+
+from acedb.acedb import AceDB
+
+
+def test_repeat_plans_do_not_query_the_stored_ranges(range_client):
+    client, cursor = range_client(
+        [("XNAS_ITCH", "ohlcv_1m", "AAPL", datetime(2024, 1, 1), datetime(2024, 2, 1))]
+    )
+    acedb = AceDB.__new__(AceDB)
+    acedb._clients = {"database": client}
+    acedb._clients_lock = threading.Lock()
+
+    for _ in range(2):
+        tasks = acedb._plan_fetches(
+            dataset="XNAS_ITCH",
+            schemas=["ohlcv-1m"],
+            symbols=["AAPL"],
+            start=datetime(2024, 1, 2),
+            end=datetime(2024, 1, 31),
+            stype_in="raw_symbol",
+        )
+        assert tasks == []
+
+    assert len(cursor.queries) == 1
@@ -0,0 +1,39 @@
+import json
+
+from click.testing import CliRunner
+
+from acedb import cli
+
+
+def _set_budget(tmp_path, monkeypatch, config, *args):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+    monkeypatch.setattr(cli, "CONFIG_PATH", config_path)
+    result = CliRunner().invoke(cli.cli, ["set-budget", *args])
+    assert result.exit_code == 0, result.output
+    return json.loads(config_path.read_text())
+
+
+def test_set_budget_keeps_options_that_are_left_out(tmp_path, monkeypatch):
+    config = {
+        "max_cost_per_call": 5,
+        "auto_approve_below": 1,
+        "interactive": False,
+    }
+
+    config = _set_budget(tmp_path, monkeypatch, config, "--per-day", "50")
+
+    assert config == {
+        "max_cost_per_call": 5,
+        "max_cost_per_day": 50,
+        "auto_approve_below": 1,
+        "interactive": False,
+    }
+
+
+def test_set_budget_clear_removes_a_setting(tmp_path, monkeypatch):
+    config = {"max_cost_per_call": 5, "interactive": False}
+
+    config = _set_budget(tmp_path, monkeypatch, config, "--clear", "per-call")
+
+    assert config == {"interactive": False}
@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+import polars as pl
+import pytest
+
+from acedb.dbnclient import DBNClient
+
+SCHEMA = "acedb_test"
+TICK_COLUMNS = [
+    {"name": "ts_recv", "type": "timestamp"},
+    {"name": "ts_event", "type": "timestamp"},
+    {"name": "instrument_id", "type": "uint32_t"},
+    {"name": "publisher_id", "type": "uint16_t"},
+    {"name": "sequence", "type": "uint32_t"},
+    {"name": "action", "type": "char"},
+    {"name": "side", "type": "char"},
+    {"name": "depth", "type": "uint8_t"},
+    {"name": "price", "type": "float"},
+    {"name": "size", "type": "uint32_t"},
+    {"name": "flags", "type": "uint8_t"},
+    {"name": "bid_sz_00", "type": "uint32_t"},
+    {"name": "symbol", "type": "string"},
+]
+
+
+@pytest.mark.parametrize("schema", ["trades", "tbbo", "mbp-1", "mbp-10", "mbo"])
+def test_tick_schemas_have_no_natural_key(schema):
+    assert DBNClient._get_natural_key(schema) is None
+
+
+@pytest.fixture
+def database():
+    if "PGHOST" not in os.environ:
+        pytest.skip("PGHOST is not set, no test database")
+    from acedb.postgreclient import PostgreDBClient
+
+    client = PostgreDBClient(
+        host=os.environ["PGHOST"],
+        port=os.environ.get("PGPORT", 5432),
+        db_name=os.environ.get("PGDATABASE", "postgres"),
+        username=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+    with client._get_cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE')
+        cursor.execute(f'CREATE SCHEMA "{SCHEMA}"')
+    yield client
+    with client._get_cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE')
+    client.close()
+
+
+def test_rows_with_the_same_key_fields_are_kept(database):
+    database._create_table(SCHEMA, "mbp-1", TICK_COLUMNS)
+    ts = datetime(2024, 1, 2, 14, 30)
+    row = {
+        "ts_recv": ts,
+        "ts_event": ts,
+        "instrument_id": 1,
+        "publisher_id": 1,
+        "sequence": 7,
+        "action": "A",
+        "side": "B",
+        "depth": 0,
+        "price": 100.25,
+        "size": 5,
+        "flags": 0,
+        "symbol": "ESH4",
+    }
+    data = pl.DataFrame([{**row, "bid_sz_00": 5}, {**row, "bid_sz_00": 10}])
+    window = [(datetime(2024, 1, 2), datetime(2024, 1, 3))]
+
+    for _ in range(2):
+        database._insert_data(
+            SCHEMA,
+            "mbp-1",
+            data,
+            conflict_key=DBNClient._get_natural_key("mbp-1"),
+            replace_symbols=["ESH4"],
+            replace_ranges=window,
+        )
+
+    with database._get_cursor() as cursor:
+        cursor.execute(f'SELECT bid_sz_00 FROM "{SCHEMA}"."mbp_1" ORDER BY 1')
+        assert [row[0] for row in cursor.fetchall()] == [5, 10]
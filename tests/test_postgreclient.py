@@ -0,0 +1,47 @@
+from datetime import datetime
+from decimal import Decimal
+
+import polars as pl
+
+from acedb.postgreclient import PostgreDBClient
+
+PG_TYPES = {
+    "ts_event": "timestamp with time zone",
+    "price": "double precision",
+    "size": "bigint",
+    "volume": "numeric",
+    "symbol": "text",
+}
+
+
+def _chunk(rows):
+    return PostgreDBClient._cast_to_pg_types(
+        PostgreDBClient._rows_to_polars(rows, list(PG_TYPES)), PG_TYPES
+    )
+
+
+def test_streamed_chunks_have_table_types_when_a_column_is_all_null():
+    first = _chunk([(None, None, None, None, None)])
+    second = _chunk([(None, 1.5, 2, Decimal("3.25"), "AAPL")])
+
+    assert first.schema == second.schema
+    assert second.schema["price"] == pl.Float64
+    assert second.schema["size"] == pl.Int64
+    assert second.schema["volume"] == pl.Float64
+    assert second.schema["symbol"] == pl.Utf8
+    assert pl.concat([first, second]).height == 2
+
+
+def test_repeat_range_lookups_are_answered_from_the_index(range_client):
+    stored = (datetime(2024, 1, 1), datetime(2024, 2, 1))
+    client, cursor = range_client([("XNAS_ITCH", "ohlcv_1m", "AAPL", *stored)])
+
+    first = client.retrieve_ranges_bulk("XNAS.ITCH", "ohlcv-1m", ["AAPL", "MSFT"])
+    second = client.retrieve_ranges_bulk("XNAS.ITCH", "ohlcv-1m", ["AAPL", "MSFT"])
+
+    assert first == second == {"AAPL": [stored], "MSFT": []}
+    assert len(cursor.queries) == 1
+
+    client._range_index.invalidate([("XNAS_ITCH", "ohlcv_1m", "AAPL")])
+    client.retrieve_ranges_bulk("XNAS.ITCH", "ohlcv-1m", ["AAPL", "MSFT"])
+    assert len(cursor.queries) == 2